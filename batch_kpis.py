@@ -0,0 +1,158 @@
+# Processamento em Lote de KPIs
+# Calcula os KPIs do dashboard para muitas planilhas em paralelo, sem Streamlit,
+# e grava um único arquivo consolidado (JSON ou Parquet)
+#
+# Uso:
+#   python batch_kpis.py "planilhas/vendedores/*.xlsx" "planilhas/regioes/*.xlsx" --output kpis.json
+#   python batch_kpis.py planilhas/*.xlsx --workers 8 --output kpis.parquet
+#   python batch_kpis.py "equipes/*.xlsx" "historico.xlsx#Janeiro" --merge --key ID_LEAD
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+# Nos processos de lote as métricas por etapa não vão para o arquivo do dashboard
+os.environ.setdefault('DASHBOARD_METRICS_FILE', '')
+
+import pandas as pd
+
+from kpi_engine import LEAD_KEY_COLUMNS, calculate_kpis, kpis_from_cube, load_persisted_cube, load_sources, serialize_kpis, stream_cube
+
+def workbook_cube(file_path):
+    """
+    Cubo de contagens da planilha: o persistido pelo dashboard, se ainda vale; senão, montado em blocos,
+    sem carregar a planilha inteira na memória
+    """
+    cube = load_persisted_cube(file_path)
+    return cube if cube is not None else stream_cube(file_path)
+
+def process_workbook(file_path):
+    """
+    Calcula os KPIs de uma planilha. Erros são devolvidos no resultado, sem interromper o lote.
+    """
+    return _process(file_path, lambda: kpis_from_cube(workbook_cube(file_path)))
+
+def process_merged(fontes, chave=None, workers=None):
+    """
+    Junta todas as planilhas e abas num só conjunto e calcula os KPIs uma vez.
+    Com `chave`, os leads repetidos são descartados e contados em 'leads_repetidos'.
+    """
+    repetidos = {}
+
+    def calcular():
+        df = load_sources(fontes, chave=chave, workers=workers)
+        repetidos['leads_repetidos'] = df.attrs['leads_repetidos']
+        return calculate_kpis(df)
+
+    resultado = _process(' + '.join(fontes), calcular)
+    resultado.update(repetidos)
+    return resultado
+
+def _process(nome, calcular):
+    inicio = time.perf_counter()
+    resultado = {'arquivo': nome}
+    try:
+        kpis = calcular()
+        resultado['status'] = 'ok'
+        resultado['kpis'] = serialize_kpis(kpis)
+    except Exception as e:
+        resultado['status'] = 'erro'
+        resultado['erro'] = f"{type(e).__name__}: {e}"
+        resultado['detalhes'] = traceback.format_exc()
+    resultado['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+def expand_inputs(padroes):
+    """
+    Expande padrões glob em uma lista ordenada e sem repetições de arquivos
+    """
+    arquivos = []
+    for padrao in padroes:
+        encontrados = glob.glob(padrao, recursive=True) if glob.has_magic(padrao) else [padrao]
+        arquivos.extend(encontrados)
+    return sorted(set(arquivos))
+
+def run_batch(arquivos, workers=None):
+    """
+    Processa as planilhas num pool de processos, na ordem em que terminam
+    """
+    resultados = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(process_workbook, arquivo): arquivo for arquivo in arquivos}
+        for futuro in as_completed(futuros):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                # Falha do próprio processo (ex.: sem memória)
+                resultado = {'arquivo': futuros[futuro], 'status': 'erro', 'erro': f"{type(e).__name__}: {e}"}
+            resultados.append(resultado)
+            situacao = 'ok' if resultado['status'] == 'ok' else f"ERRO - {resultado['erro']}"
+            print(f"[{len(resultados)}/{len(arquivos)}] {resultado['arquivo']}: {situacao}", file=sys.stderr)
+    return sorted(resultados, key=lambda r: r['arquivo'])
+
+def write_output(resultados, output):
+    """
+    Grava o consolidado: JSON completo, ou Parquet com uma linha por planilha
+    """
+    if output.endswith('.parquet'):
+        linhas = []
+        for r in resultados:
+            kpis = r.get('kpis', {})
+            linhas.append({
+                'arquivo': r['arquivo'],
+                'status': r['status'],
+                'erro': r.get('erro'),
+                'segundos': r.get('segundos'),
+                'leads_dia': kpis.get('leads_dia'),
+                'total_leads': kpis.get('total_leads'),
+                'total_sem_resposta': kpis.get('total_sem_resposta'),
+                'percentual_sem_resposta': kpis.get('percentual_sem_resposta'),
+                # Tabelas ficam como listas de registros (colunas aninhadas no Parquet)
+                'leads_por_dia': kpis.get('leads_por_dia'),
+                'canal_performance': kpis.get('canal_performance'),
+                'sem_resposta_por_segmento': kpis.get('sem_resposta_por_segmento')
+            })
+        pd.DataFrame(linhas).to_parquet(output, index=False)
+    else:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'gerado_em': datetime.now().isoformat(timespec='seconds'),
+                'arquivos': resultados
+            }, f, ensure_ascii=False, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcula os KPIs de várias planilhas de leads em paralelo")
+    parser.add_argument('inputs', nargs='+', help="Arquivos ou padrões glob (.xlsx)")
+    parser.add_argument('--workers', type=int, default=None, help="Processos em paralelo (padrão: núcleos da máquina)")
+    parser.add_argument('--output', default='kpis_consolidados.json', help="Arquivo .json ou .parquet")
+    parser.add_argument('--merge', action='store_true', help="Junta todas as abas de todas as planilhas num só conjunto de KPIs")
+    parser.add_argument('--key', default=','.join(LEAD_KEY_COLUMNS),
+                        help="Colunas que identificam um lead no --merge (separadas por vírgula); sem chave, nenhum lead é descartado")
+    args = parser.parse_args()
+
+    if args.merge:
+        chave = [col.strip() for col in args.key.split(',') if col.strip()]
+        resultados = [process_merged(args.inputs, chave, args.workers)]
+        if resultados[0]['status'] != 'ok':
+            print(f"ERRO - {resultados[0]['erro']}", file=sys.stderr)
+        elif chave:
+            print(f"{resultados[0]['leads_repetidos']} linhas repetidas (chave {', '.join(chave)}) descartadas na junção", file=sys.stderr)
+    else:
+        arquivos = expand_inputs(args.inputs)
+        if not arquivos:
+            parser.error("Nenhuma planilha encontrada")
+        resultados = run_batch(arquivos, args.workers)
+    write_output(resultados, args.output)
+
+    erros = sum(1 for r in resultados if r['status'] != 'ok')
+    print(f"{len(resultados) - erros} planilhas processadas, {erros} com erro. Consolidado em {args.output}", file=sys.stderr)
+    sys.exit(1 if erros else 0)
+
+if __name__ == "__main__":
+    main()
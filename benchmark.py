@@ -0,0 +1,221 @@
+# Benchmark do Pipeline do Dashboard
+# Mede tempo e pico de memória de load_data -> calculate_kpis -> create_charts
+# sobre planilhas sintéticas de tamanhos crescentes
+#
+# Uso:
+#   python benchmark.py --sizes 10000 100000 1000000 --output bench_results.json
+#   python benchmark.py --sizes 10000 100000 --compare bench_results_anterior.json
+#   python benchmark.py --sizes 10000 --startup   # também mede importações e primeira pintura
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Nos benchmarks as métricas por etapa não vão para o arquivo do dashboard
+os.environ.setdefault('DASHBOARD_METRICS_FILE', '')
+
+import pandas as pd
+
+import kpi_engine
+import kpi_views
+from generate_leads import XLSX_MAX_ROWS, generate_leads, write_leads
+
+DEFAULT_SIZES = [10000, 100000, 1000000, 10000000]
+# Escrever .xlsx grandes com openpyxl leva muitos minutos; acima disso usa Parquet
+DEFAULT_XLSX_MAX_ROWS = 200000
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def _clear_caches(path):
+    for sufixo in (kpi_engine.SIDECAR_SUFFIX, kpi_engine.SNAPSHOT_SUFFIX):
+        if os.path.exists(f"{path}{sufixo}"):
+            os.remove(f"{path}{sufixo}")
+
+def _measure(func, repeat, setup=None):
+    """
+    Executa `func` `repeat` vezes medindo o tempo e, numa execução extra, o pico de memória.
+    Retorna (resultado, tempos, pico_mb).
+    """
+    tempos = []
+    resultado = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        inicio = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - inicio)
+
+    # tracemalloc deixa tudo mais lento: a memória é medida numa execução separada
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, tempos, pico / 1024 / 1024
+
+def run_size(rows, workdir, repeat, xlsx_max_rows, seed):
+    """
+    Mede cada etapa do pipeline para uma planilha de `rows` linhas
+    """
+    usa_xlsx = rows <= min(xlsx_max_rows, XLSX_MAX_ROWS)
+    path = os.path.join(workdir, f"leads_{rows}.{'xlsx' if usa_xlsx else 'parquet'}")
+    write_leads(generate_leads(rows, channels=6, segments=20, days=730, seed=seed), path)
+
+    medidas = []
+    def registrar(etapa, tempos, pico_mb):
+        medidas.append({
+            'rows': rows,
+            'source': 'xlsx' if usa_xlsx else 'parquet',
+            'stage': etapa,
+            'seconds_min': min(tempos),
+            'seconds_median': statistics.median(tempos),
+            'peak_mb': round(pico_mb, 2)
+        })
+
+    if usa_xlsx:
+        # Carga a frio (sem cache colunar) e a quente (cache colunar e snapshot válidos)
+        load = kpi_engine.load_dataset
+        df, tempos, pico = _measure(lambda: load(path), repeat, setup=lambda: _clear_caches(path))
+        registrar('load_data_cold', tempos, pico)
+        df, tempos, pico = _measure(lambda: load(path), repeat)
+        registrar('load_data_warm', tempos, pico)
+        cube = kpi_engine.load_persisted_cube(path)
+        _clear_caches(path)
+    else:
+        # Acima do limite do Excel, mede a mesma limpeza a partir da fonte colunar
+        def load():
+            df = kpi_engine.clean_data(pd.read_parquet(path))
+            return df, kpi_engine.build_cube(df)
+        (df, cube), tempos, pico = _measure(load, repeat)
+        registrar('load_data_cold', tempos, pico)
+
+    kpis, tempos, pico = _measure(lambda: kpi_engine.calculate_kpis(df), repeat)
+    registrar('calculate_kpis', tempos, pico)
+    kpis, tempos, pico = _measure(lambda: kpi_engine.calculate_kpis(df, cube), repeat)
+    registrar('calculate_kpis_from_cube', tempos, pico)
+    _, tempos, pico = _measure(lambda: kpi_views.create_charts(kpis), repeat)
+    registrar('create_charts', tempos, pico)
+
+    os.remove(path)
+    return medidas
+
+# Processo novo por medida: inicia o dashboard (AppTest) e devolve os registros de inicialização
+STARTUP_SCRIPT = """
+import json, sys
+from streamlit.testing.v1 import AppTest
+AppTest.from_file(sys.argv[1], default_timeout=600).run()
+import kpi_engine
+print(json.dumps([r for r in kpi_engine.get_metrics_log().recent() if 'orcamento_s' in r]))
+"""
+
+def run_startup(rows, workdir, repeat, seed):
+    """
+    Mede, em processos novos, as importações e a primeira pintura do dashboard com o snapshot de KPIs já gravado
+    """
+    pasta = os.path.join(workdir, f"startup_{rows}")
+    os.makedirs(pasta, exist_ok=True)
+    write_leads(generate_leads(rows, channels=6, segments=20, days=730, seed=seed), os.path.join(pasta, kpi_engine.DEFAULT_FILE))
+    env = {
+        **os.environ,
+        'DASHBOARD_METRICS_FILE': '',
+        'DASHBOARD_API_PORT': '',
+        'DASHBOARD_FORECAST_DIR': os.path.join(pasta, '.forecast_cache')
+    }
+    dashboard_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard.py')
+    
+    def iniciar():
+        saida = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT, dashboard_path],
+            cwd=pasta, env=env, capture_output=True, text=True, check=True
+        )
+        return {r['etapa']: r for r in json.loads(saida.stdout.strip().splitlines()[-1])}
+    
+    # A primeira inicialização calcula e grava o snapshot; as medidas são das seguintes
+    iniciar()
+    tempos = {}
+    for _ in range(repeat):
+        for etapa, registro in iniciar().items():
+            tempos.setdefault(etapa, []).append(registro['segundos'])
+    
+    return [{
+        'rows': rows,
+        'source': 'xlsx',
+        'stage': etapa.replace('.', '_').replace('primeira_pintura', 'first_paint'),
+        'seconds_min': min(valores),
+        'seconds_median': statistics.median(valores),
+        'peak_mb': None,
+        'budget_s': kpi_engine.STARTUP_BUDGET.get(etapa)
+    } for etapa, valores in tempos.items()]
+
+def compare(atual, anterior):
+    """
+    Mostra a variação de tempo de cada etapa em relação a um resultado anterior
+    """
+    base = {(m['rows'], m['stage']): m for m in anterior['results']}
+    print(f"\nComparação com {anterior.get('commit') or 'resultado anterior'}:")
+    for m in atual['results']:
+        ref = base.get((m['rows'], m['stage']))
+        if ref is None or not ref['seconds_min']:
+            continue
+        razao = m['seconds_min'] / ref['seconds_min']
+        alerta = '  <-- regressão' if razao > 1.2 else ''
+        print(f"{m['rows']:>10} {m['stage']:<26} {ref['seconds_min']:9.4f}s -> {m['seconds_min']:9.4f}s ({razao:5.2f}x){alerta}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline load -> KPIs -> gráficos")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--xlsx-max-rows', type=int, default=DEFAULT_XLSX_MAX_ROWS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="Arquivo JSON de uma execução anterior")
+    parser.add_argument('--startup', action='store_true', help="Mede também as importações e a primeira pintura (orçamento de inicialização)")
+    args = parser.parse_args()
+
+    resultado = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'results': []
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            for m in run_size(rows, workdir, args.repeat, args.xlsx_max_rows, args.seed):
+                resultado['results'].append(m)
+                print(f"{m['rows']:>10} {m['stage']:<26} {m['seconds_min']:9.4f}s  pico {m['peak_mb']:9.2f} MB")
+            if args.startup and rows <= min(args.xlsx_max_rows, XLSX_MAX_ROWS):
+                for m in run_startup(rows, workdir, args.repeat, args.seed):
+                    resultado['results'].append(m)
+                    alerta = '  <-- acima do orçamento' if m['budget_s'] and m['seconds_median'] > m['budget_s'] else ''
+                    print(f"{m['rows']:>10} {m['stage']:<26} {m['seconds_min']:9.4f}s  orçamento {m['budget_s']}s{alerta}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2)
+    print(f"\nResultados gravados em {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(resultado, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -1,582 +1,864 @@
-# Dashboard de Análise de Leads
-# Criado com Streamlit e Plotly para análise avançada de performance de leads
-
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, date
-import numpy as np
-
-# CONFIGURAÇÃO DA PÁGINA
-st.set_page_config(
-    page_title="Dashboard de Leads",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
-
-# CSS CUSTOMIZADO - VERSÃO LIMPA SEM SIDEBAR
-st.markdown("""
-<style>
-    /* CONFIGURAÇÕES GERAIS */
-    .main {
-        padding-top: 2rem;
-    }
-    
-    /* TÍTULO PRINCIPAL */
-    .main-title {
-        font-size: 2.5rem !important;
-        font-weight: 700 !important;
-        color: #1e3d59 !important;
-        text-align: center;
-        margin-bottom: 2rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    /* SUBTÍTULOS */
-    .section-title {
-        font-size: 1.5rem !important;
-        font-weight: 600 !important;
-        color: #2c5f2d !important;
-        margin-bottom: 1rem;
-        border-bottom: 2px solid #97bc62;
-        padding-bottom: 0.5rem;
-    }
-    
-    /* CARTÕES DE KPI - Nova paleta roxa */
-    .metric-card {
-        background: linear-gradient(135deg, #72559a 0%, #9177d1 100%);
-        padding: 1.5rem;
-        border-radius: 15px;
-        color: white !important;
-        text-align: center;
-        box-shadow: 0 8px 32px rgba(114,85,154,0.3);
-        margin-bottom: 1rem;
-        border: 1px solid rgba(255,255,255,0.2);
-    }
-    
-    /* NÚMEROS DOS KPIs */
-    .metric-number {
-        font-size: 2.5rem !important;
-        font-weight: 700 !important;
-        color: #ffffff !important;
-    }
-    
-    /* RÓTULOS DOS KPIs */
-    .metric-label {
-        font-size: 1rem !important;
-        color: #f0f0f0 !important;
-        margin-top: 0.5rem;
-    }
-    
-    /* CARTÕES DE ALERTA */
-    .alert-card {
-        background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
-        padding: 1.5rem;
-        border-radius: 15px;
-        color: white !important;
-        text-align: center;
-        box-shadow: 0 8px 32px rgba(255,0,0,0.1);
-        margin-bottom: 1rem;
-    }
-    
-    /* CARTÕES DE SUCESSO */
-    .success-card {
-        background: linear-gradient(135deg, #56ab2f 0%, #a8e6cf 100%);
-        padding: 1.5rem;
-        border-radius: 15px;
-        color: white !important;
-        text-align: center;
-        box-shadow: 0 8px 32px rgba(0,255,0,0.1);
-        margin-bottom: 1rem;
-    }
-    
-    /* ESCONDER SIDEBAR COMPLETAMENTE */
-    section[data-testid="stSidebar"] {
-        display: none !important;
-    }
-    
-    /* AJUSTAR CONTEÚDO PRINCIPAL SEM SIDEBAR */
-    .main .block-container {
-        padding-left: 1rem !important;
-        padding-right: 1rem !important;
-        max-width: 100% !important;
-    }
-    
-    /* GRÁFICOS - Container dos gráficos */
-    .plot-container {
-        background: white;
-        border-radius: 10px;
-        padding: 1rem;
-        box-shadow: 0 4px 16px rgba(0,0,0,0.1);
-        margin-bottom: 2rem;
-    }
-    
-    /* BOTÃO DE ATUALIZAR NO RODAPÉ - Nova paleta roxa */
-    .refresh-button {
-        position: fixed;
-        bottom: 20px;
-        right: 20px;
-        background: linear-gradient(135deg, #72559a 0%, #9177d1 100%);
-        color: white;
-        border: none;
-        border-radius: 50px;
-        padding: 15px 20px;
-        box-shadow: 0 4px 20px rgba(114,85,154, 0.4);
-        cursor: pointer;
-        font-size: 16px;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        z-index: 1000;
-    }
-    
-    .refresh-button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 25px rgba(114,85,154, 0.6);
-    }
-    
-    /* ESCONDER ELEMENTOS PADRÃO DO STREAMLIT */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* REMOVER DIVS VAZIAS */
-    div:empty {
-        display: none !important;
-    }
-    
-    /* ESTILO PARA TABELA */
-    .dataframe {
-        font-size: 14px;
-    }
-    
-    /* TABELA PERSONALIZADA */
-    .custom-table {
-        background: white;
-        border-radius: 10px;
-        padding: 1rem;
-        box-shadow: 0 4px 16px rgba(0,0,0,0.1);
-        margin-bottom: 2rem;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# FUNÇÃO PARA CARREGAR E PROCESSAR DADOS
-@st.cache_data
-def load_data(file_path=None):
-    """
-    Carrega e processa os dados do Excel
-    """
-    try:
-        if file_path is None:
-            file_path = r"dashboard_rank.xlsx"
-        
-        df = pd.read_excel(file_path)
-        
-        # LIMPEZA E FORMATAÇÃO DOS DADOS
-        df['DATA_ABORDAGEM'] = pd.to_datetime(df['DATA_ABORDAGEM'], errors='coerce')
-        df = df.dropna(subset=['DATA_ABORDAGEM'])
-        
-        text_columns = ['SEGMENTO', 'CANAL', 'RESULTADO']
-        for col in text_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.strip().str.upper()
-        
-        # CORREÇÃO 1: Criar campo para evolução DIÁRIA em vez de mensal
-        df['DIA'] = df['DATA_ABORDAGEM'].dt.date
-        df['MES_ANO'] = df['DATA_ABORDAGEM'].dt.to_period('M')
-        
-        # CORREÇÃO 2: Lógica corrigida para classificação de respostas
-        # Definir corretamente quais são as respostas positivas/efetivas
-        respostas_positivas = ['RESPONDEU E MARCOU CALL', 'POSITIVO', 'INTERESSADO']
-        respostas_efetivas = ['RESPONDEU E MARCOU CALL', 'NEGATIVO', 'POSITIVO', 'INTERESSADO']
-        sem_resposta = ['NÃO RESPONDEU', 'VISUALIZOU E NÃO RESPONDEU']
-        
-        # Criar flags corretas
-        df['TEVE_RETORNO'] = ~df['RESULTADO'].isin(sem_resposta)
-        df['RESPOSTA_POSITIVA'] = df['RESULTADO'].isin(respostas_positivas)
-        df['RESPOSTA_EFETIVA'] = df['RESULTADO'].isin(respostas_efetivas)
-        
-        return df
-    except Exception as e:
-        st.error(f"Erro ao carregar o arquivo: {str(e)}")
-        return None
-
-# FUNÇÃO PARA CALCULAR KPIS
-def calculate_kpis(df):
-    """
-    Calcula todos os KPIs necessários
-    """
-    kpis = {}
-    
-    # LEADS DO DIA MAIS RECENTE
-    if not df.empty:
-        kpis['leads_dia'] = len(df[df['DIA'] == df['DIA'].max()])
-    else:
-        kpis['leads_dia'] = 0
-    
-    # CORREÇÃO: EVOLUÇÃO DIÁRIA em vez de mensal
-    if not df.empty:
-        leads_por_dia = df.groupby('DIA').size().reset_index(name='leads')
-        leads_por_dia['dia_formatado'] = pd.to_datetime(leads_por_dia['DIA']).dt.strftime('%d/%m')
-        # Ordenar por data para garantir sequência correta
-        leads_por_dia = leads_por_dia.sort_values('DIA')
-        kpis['leads_por_dia'] = leads_por_dia
-    else:
-        kpis['leads_por_dia'] = pd.DataFrame()
-    
-    # CORREÇÃO DEFINITIVA: Análise de canais simplificada e robusta
-    if len(df) > 0 and 'CANAL' in df.columns and 'RESULTADO' in df.columns:
-        # Método mais direto - contar por canal
-        canal_counts = df.groupby('CANAL').size().reset_index(name='total_leads')
-        
-        # Para cada canal, calcular estatísticas
-        canal_stats_list = []
-        
-        for canal in canal_counts['CANAL'].unique():
-            canal_df = df[df['CANAL'] == canal]
-            
-            total = len(canal_df)
-            
-            # Contar tipos de resposta diretamente
-            sem_resposta = len(canal_df[canal_df['RESULTADO'].isin(['NÃO RESPONDEU', 'VISUALIZOU E NÃO RESPONDEU'])])
-            com_retorno = total - sem_resposta
-            
-            # Respostas específicas
-            negativo = len(canal_df[canal_df['RESULTADO'] == 'NEGATIVO'])
-            positivo = len(canal_df[canal_df['RESULTADO'].isin(['POSITIVO', 'INTERESSADO', 'RESPONDEU E MARCOU CALL'])])
-            
-            # Calcular taxas
-            taxa_retorno = (com_retorno / total * 100) if total > 0 else 0
-            taxa_positiva = (positivo / total * 100) if total > 0 else 0
-            
-            canal_stats_list.append({
-                'CANAL': canal,
-                'total_leads': total,
-                'com_retorno': com_retorno,
-                'sem_resposta': sem_resposta,
-                'respostas_negativas': negativo,
-                'respostas_positivas': positivo,
-                'taxa_retorno': round(taxa_retorno, 1),
-                'taxa_positiva': round(taxa_positiva, 1)
-            })
-        
-        kpis['canal_performance'] = pd.DataFrame(canal_stats_list)
-    else:
-        kpis['canal_performance'] = pd.DataFrame()
-    
-    # ANÁLISE DE SEGMENTOS SEM RESPOSTA
-    if 'SEGMENTO' in df.columns and 'RESULTADO' in df.columns:
-        sem_resposta_lista = ['NÃO RESPONDEU', 'VISUALIZOU E NÃO RESPONDEU']
-        sem_resposta = df[df['RESULTADO'].isin(sem_resposta_lista)]
-        if not sem_resposta.empty:
-            kpis['sem_resposta_por_segmento'] = sem_resposta.groupby('SEGMENTO').size().reset_index(name='quantidade')
-        else:
-            kpis['sem_resposta_por_segmento'] = pd.DataFrame()
-    else:
-        kpis['sem_resposta_por_segmento'] = pd.DataFrame()
-    
-    # ESTATÍSTICAS GERAIS
-    total_leads = len(df)
-    if 'RESULTADO' in df.columns:
-        sem_resposta_lista = ['NÃO RESPONDEU', 'VISUALIZOU E NÃO RESPONDEU']
-        leads_sem_resposta = len(df[df['RESULTADO'].isin(sem_resposta_lista)])
-        kpis['total_sem_resposta'] = leads_sem_resposta
-        kpis['percentual_sem_resposta'] = round(leads_sem_resposta / total_leads * 100, 1) if total_leads > 0 else 0
-    else:
-        kpis['total_sem_resposta'] = 0
-        kpis['percentual_sem_resposta'] = 0
-    
-    # CORES MODERNAS - Nova paleta roxa
-    cores_modernas = [
-        '#72559a',  # Roxo escuro
-        '#9177d1',  # Roxo médio
-        '#c5a2f2',  # Roxo claro
-        '#d5c5e3',  # Roxo muito claro
-        '#f6f2fa',  # Quase branco
-        '#e74c3c',  # Vermelho para contraste
-        '#3498db',  # Azul para contraste
-        '#2ecc71'   # Verde para contraste
-    ]
-    kpis['cores_modernas'] = cores_modernas
-    
-    return kpis
-
-# FUNÇÃO PARA CRIAR GRÁFICOS
-def create_charts(kpis):
-    """
-    Cria todos os gráficos do dashboard
-    """
-    charts = {}
-    
-    # GRÁFICO 1: Evolução DIÁRIA de leads (CORRIGIDO)
-    if not kpis['leads_por_dia'].empty:
-        fig_daily = px.line(
-            kpis['leads_por_dia'], 
-            x='dia_formatado', 
-            y='leads',
-            title='📈 Evolução Diária de Leads',
-            markers=True
-        )
-        
-        fig_daily.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_family="Inter, -apple-system, BlinkMacSystemFont, sans-serif",
-            title_font_size=20,
-            title_font_color='#1f2937',
-            title_x=0.02,
-            xaxis_title="Dia",
-            yaxis_title="Quantidade de Leads",
-            showlegend=False,
-            margin=dict(l=40, r=40, t=60, b=40),
-            xaxis=dict(
-                showgrid=False,
-                showline=False,
-                zeroline=False,
-                tickfont=dict(color='#6b7280', size=12),
-                tickangle=45
-            ),
-            yaxis=dict(
-                showgrid=True,
-                gridcolor='rgba(0,0,0,0.05)',
-                showline=False,
-                zeroline=False,
-                tickfont=dict(color='#6b7280', size=12)
-            )
-        )
-        
-        fig_daily.update_traces(
-            line=dict(color='#72559a', width=3),
-            marker=dict(color='#72559a', size=8, line=dict(color='white', width=2)),
-            hovertemplate='<b>Dia %{x}</b><br>Leads: %{y}<extra></extra>'
-        )
-        charts['daily_evolution'] = fig_daily
-    
-    # GRÁFICO 2: Lead's que me responderam (NOME ALTERADO)
-    if not kpis['canal_performance'].empty:
-        fig_channel = go.Figure(data=[go.Pie(
-            labels=kpis['canal_performance']['CANAL'],
-            values=kpis['canal_performance']['taxa_retorno'],
-            hole=0.8,
-            marker=dict(
-                colors=kpis['cores_modernas'][:len(kpis['canal_performance'])],
-                line=dict(color='white', width=3)
-            ),
-            textinfo='label+percent',
-            textfont=dict(size=14, color='#72559a'),
-            hovertemplate='<b>%{label}</b><br>Taxa de Retorno: %{value}%<br>Total: %{customdata} leads<extra></extra>',
-            customdata=kpis['canal_performance']['total_leads']
-        )])
-        
-        fig_channel.update_layout(
-            title='📊 Lead\'s que me responderam',
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_family="Inter, -apple-system, BlinkMacSystemFont, sans-serif",
-            title_font_size=20,
-            title_font_color='#1f2937',
-            title_x=0.02,
-            showlegend=True,
-            legend=dict(
-                orientation="v",
-                yanchor="middle",
-                y=0.5,
-                xanchor="left",
-                x=1.05,
-                font=dict(size=12)
-            ),
-            margin=dict(l=40, r=120, t=60, b=40),
-            annotations=[dict(
-                text=f"Taxa Média<br><b>{kpis['canal_performance']['taxa_retorno'].mean():.1f}%</b>",
-                x=0.5, y=0.5,
-                font_size=16,
-                font_color='#72559a',
-                showarrow=False
-            )]
-        )
-        charts['channel_performance'] = fig_channel
-    
-    # GRÁFICO 3: Lead que não responderam (NOME ALTERADO)
-    if not kpis['sem_resposta_por_segmento'].empty:
-        fig_segments = go.Figure(data=[go.Pie(
-            labels=kpis['sem_resposta_por_segmento']['SEGMENTO'],
-            values=kpis['sem_resposta_por_segmento']['quantidade'],
-            hole=0.8,
-            marker=dict(
-                colors=kpis['cores_modernas'][:len(kpis['sem_resposta_por_segmento'])],
-                line=dict(color='white', width=3)
-            ),
-            textinfo='label+percent',
-            textfont=dict(size=14, color='#72559a'),
-            hovertemplate='<b>%{label}</b><br>Sem resposta: %{value}<extra></extra>'
-        )])
-        
-        fig_segments.update_layout(
-            title='🎯 Lead\'s que não responderam',
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_family="Inter, -apple-system, BlinkMacSystemFont, sans-serif",
-            title_font_size=20,
-            title_font_color='#1f2937',
-            title_x=0.02,
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="top",
-                y=-0.05,
-                xanchor="center",
-                x=0.5,
-                font=dict(size=12)
-            ),
-            margin=dict(l=40, r=40, t=60, b=80),
-            annotations=[dict(
-                text=f"Total<br><b>{kpis['sem_resposta_por_segmento']['quantidade'].sum()}</b>",
-                x=0.5, y=0.5,
-                font_size=16,
-                font_color='#72559a',
-                showarrow=False
-            )]
-        )
-        charts['segments_no_response'] = fig_segments
-    
-    return charts
-
-# INTERFACE PRINCIPAL
-def main():
-    # TÍTULO PRINCIPAL
-    st.markdown('<h1 class="main-title">📊 Dashboard Comercial Rankrup</h1>', unsafe_allow_html=True)
-    
-    try:
-        # Carrega os dados automaticamente
-        df = load_data()
-        
-        if df is None:
-            return
-        
-        # Calcula KPIs
-        kpis = calculate_kpis(df)
-        
-        # SEÇÃO 1: KPIs PRINCIPAIS
-        st.markdown('<h2 class="section-title">📈 KPIs Principais</h2>', unsafe_allow_html=True)
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-number">{kpis['leads_dia']}</div>
-                <div class="metric-label">Leads Abordados Hoje</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown(f"""
-            <div class="alert-card">
-                <div class="metric-number">{kpis['total_sem_resposta']}</div>
-                <div class="metric-label">Leads Sem Resposta</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown(f"""
-            <div class="alert-card">
-                <div class="metric-number">{kpis['percentual_sem_resposta']}%</div>
-                <div class="metric-label">% Sem Resposta</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            total_leads = len(df)
-            st.markdown(f"""
-            <div class="success-card">
-                <div class="metric-number">{total_leads}</div>
-                <div class="metric-label">Total de Leads</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # SEÇÃO 2: GRÁFICOS ANALÍTICOS
-        st.markdown('<h2 class="section-title">📊 Análises Detalhadas</h2>', unsafe_allow_html=True)
-        
-        charts = create_charts(kpis)
-        
-        # Layout dos gráficos
-        col_left, col_right = st.columns([2, 1])
-        
-        with col_left:
-            if 'daily_evolution' in charts:
-                st.plotly_chart(charts['daily_evolution'], use_container_width=True)
-        
-        with col_right:
-            if 'channel_performance' in charts:
-                st.plotly_chart(charts['channel_performance'], use_container_width=True)
-        
-        # Gráfico de segmentos (largura total)
-        if 'segments_no_response' in charts:
-            st.plotly_chart(charts['segments_no_response'], use_container_width=True)
-        
-        # SEÇÃO 3: INSIGHTS AUTOMÁTICOS
-        st.markdown('<h2 class="section-title">💡 Insights Automáticos</h2>', unsafe_allow_html=True)
-        
-        if not kpis['canal_performance'].empty:
-            best_channel = kpis['canal_performance'].loc[kpis['canal_performance']['taxa_retorno'].idxmax(), 'CANAL']
-            best_rate = kpis['canal_performance']['taxa_retorno'].max()
-            
-            if not kpis['sem_resposta_por_segmento'].empty:
-                worst_segment = kpis['sem_resposta_por_segmento'].loc[kpis['sem_resposta_por_segmento']['quantidade'].idxmax(), 'SEGMENTO']
-                worst_count = kpis['sem_resposta_por_segmento']['quantidade'].max()
-                
-                st.info(f"""
-                **🏆 Canal Mais Eficiente:** {best_channel} com {best_rate:.1f}% de taxa de retorno
-                
-                **⚠️ Segmento com Mais Não Respostas:** {worst_segment} ({worst_count} leads sem resposta)
-                
-                **📊 Recomendação:** Foque seus esforços no canal {best_channel} e revise a estratégia para o segmento {worst_segment}
-                """)
-            else:
-                st.info(f"""
-                **🏆 Canal Mais Eficiente:** {best_channel} com {best_rate:.1f}% de taxa de retorno
-                
-                **📊 Recomendação:** Continue focando no canal {best_channel} para maximizar resultados.
-                """)
-        else:
-            st.warning("⚠️ Não foi possível gerar insights. Verifique os dados de canal.")
-        
-        # BOTÃO DE ATUALIZAR FIXO NO CANTO INFERIOR DIREITO
-        st.markdown("""
-        <div style="position: fixed; bottom: 20px; right: 20px; z-index: 1000;">
-            <form>
-                <button type="submit" class="refresh-button" onclick="window.location.reload()">
-                    🔄 Atualizar
-                </button>
-            </form>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # JavaScript para funcionalidade do botão
-        st.markdown("""
-        <script>
-        document.querySelector('.refresh-button').addEventListener('click', function(e) {
-            e.preventDefault();
-            window.location.reload();
-        });
-        </script>
-        """, unsafe_allow_html=True)
-        
-    except FileNotFoundError:
-        st.error("❌ **Arquivo não encontrado!**")
-        st.markdown("""
-        **Verifique se:**
-        - O arquivo `dashboard_rank.xlsx` existe na pasta especificada
-        - O caminho está correto
-        - Você tem permissão para acessar o arquivo
-        """)
-        
-    except Exception as e:
-        st.error(f"❌ **Erro ao carregar o arquivo:** {str(e)}")
-        st.markdown("**Detalhes do erro podem ajudar na identificação do problema.**")
-        st.write("Erro detalhado:", str(e))
-
-if __name__ == "__main__":
-    main()
+# Dashboard de Análise de Leads
+# Criado com Streamlit e Plotly para análise avançada de performance de leads
+
+import time
+
+# Início da execução: base do orçamento de inicialização (importações e primeira pintura)
+_INICIO_SCRIPT = time.perf_counter()
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+import pandas as pd
+from datetime import datetime, date
+import json
+import threading
+
+from kpi_engine import (
+    DEFAULT_FILE,
+    METRICS_FILE,
+    STORE_BACKEND,
+    FileWatcher,
+    FilterIndex,
+    LeadStore,
+    build_cube,
+    calculate_kpis,
+    deserialize_kpis,
+    df_memory_mb,
+    file_fingerprint,
+    file_signature,
+    get_metrics_log,
+    get_result_cache,
+    load_dataset,
+    load_persisted_cube,
+    measure,
+    open_store,
+    read_kpi_snapshot,
+    record_startup,
+    result_key,
+    write_kpi_snapshot,
+)
+from kpi_api import API_PORT, start_server
+from kpi_views import KPI_CARDS, build_insights, compute_snapshot, create_charts, forecast_series, section_digests, serialize_charts
+from lead_forecast import FORECAST_HORIZON, FORECAST_MIN_DAYS, ForecastManager
+
+record_startup('startup.imports', time.perf_counter() - _INICIO_SCRIPT)
+
+# CONFIGURAÇÃO DA PÁGINA
+st.set_page_config(
+    page_title="Dashboard de Leads",
+    page_icon="📊",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+# CSS CUSTOMIZADO - VERSÃO LIMPA SEM SIDEBAR
+st.markdown("""
+<style>
+    /* CONFIGURAÇÕES GERAIS */
+    .main {
+        padding-top: 2rem;
+    }
+    
+    /* TÍTULO PRINCIPAL */
+    .main-title {
+        font-size: 2.5rem !important;
+        font-weight: 700 !important;
+        color: #1e3d59 !important;
+        text-align: center;
+        margin-bottom: 2rem;
+        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
+    }
+    
+    /* SUBTÍTULOS */
+    .section-title {
+        font-size: 1.5rem !important;
+        font-weight: 600 !important;
+        color: #2c5f2d !important;
+        margin-bottom: 1rem;
+        border-bottom: 2px solid #97bc62;
+        padding-bottom: 0.5rem;
+    }
+    
+    /* CARTÕES DE KPI - Nova paleta roxa */
+    .metric-card {
+        background: linear-gradient(135deg, #72559a 0%, #9177d1 100%);
+        padding: 1.5rem;
+        border-radius: 15px;
+        color: white !important;
+        text-align: center;
+        box-shadow: 0 8px 32px rgba(114,85,154,0.3);
+        margin-bottom: 1rem;
+        border: 1px solid rgba(255,255,255,0.2);
+    }
+    
+    /* NÚMEROS DOS KPIs */
+    .metric-number {
+        font-size: 2.5rem !important;
+        font-weight: 700 !important;
+        color: #ffffff !important;
+    }
+    
+    /* RÓTULOS DOS KPIs */
+    .metric-label {
+        font-size: 1rem !important;
+        color: #f0f0f0 !important;
+        margin-top: 0.5rem;
+    }
+    
+    /* CARTÕES DE ALERTA */
+    .alert-card {
+        background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
+        padding: 1.5rem;
+        border-radius: 15px;
+        color: white !important;
+        text-align: center;
+        box-shadow: 0 8px 32px rgba(255,0,0,0.1);
+        margin-bottom: 1rem;
+    }
+    
+    /* CARTÕES DE SUCESSO */
+    .success-card {
+        background: linear-gradient(135deg, #56ab2f 0%, #a8e6cf 100%);
+        padding: 1.5rem;
+        border-radius: 15px;
+        color: white !important;
+        text-align: center;
+        box-shadow: 0 8px 32px rgba(0,255,0,0.1);
+        margin-bottom: 1rem;
+    }
+    
+    /* ESCONDER SIDEBAR COMPLETAMENTE */
+    section[data-testid="stSidebar"] {
+        display: none !important;
+    }
+    
+    /* AJUSTAR CONTEÚDO PRINCIPAL SEM SIDEBAR */
+    .main .block-container {
+        padding-left: 1rem !important;
+        padding-right: 1rem !important;
+        max-width: 100% !important;
+    }
+    
+    /* GRÁFICOS - Container dos gráficos */
+    .plot-container {
+        background: white;
+        border-radius: 10px;
+        padding: 1rem;
+        box-shadow: 0 4px 16px rgba(0,0,0,0.1);
+        margin-bottom: 2rem;
+    }
+    
+    /* ESCONDER ELEMENTOS PADRÃO DO STREAMLIT */
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    header {visibility: hidden;}
+    
+    /* REMOVER DIVS VAZIAS */
+    div:empty {
+        display: none !important;
+    }
+    
+    /* ESTILO PARA TABELA */
+    .dataframe {
+        font-size: 14px;
+    }
+    
+    /* TABELA PERSONALIZADA */
+    .custom-table {
+        background: white;
+        border-radius: 10px;
+        padding: 1rem;
+        box-shadow: 0 4px 16px rgba(0,0,0,0.1);
+        margin-bottom: 2rem;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+# PARÂMETRO DA URL QUE ABRE O PAINEL DE DIAGNÓSTICO
+DIAGNOSTICS_PARAM = 'diagnostico'
+
+# FUNÇÃO PARA CARREGAR E PROCESSAR DADOS
+@st.cache_resource(max_entries=2)
+def load_data(file_path=None, versao=None):
+    """
+    Carrega e processa os dados do Excel.
+    Uma única instância por processo é compartilhada por todas as sessões: não modificar o DataFrame.
+    `versao` (hash do Excel) separa o cache de cada versão dos dados.
+    """
+    try:
+        return load_dataset(file_path)
+    except Exception as e:
+        st.error(f"Erro ao carregar o arquivo: {str(e)}")
+        return None
+
+@st.cache_resource(max_entries=2)
+def load_cube(file_path=None, versao=None):
+    """
+    Carrega o cubo de contagens persistido junto ao cache colunar
+    """
+    return load_persisted_cube(file_path)
+
+@st.cache_resource(max_entries=2)
+def load_filter_index(file_path=None, versao=None):
+    """
+    Índice dos filtros, montado uma vez por versão dos dados a partir do cubo de contagens
+    """
+    cube = load_cube(file_path, versao)
+    if cube is None:
+        cube = build_cube(load_data(file_path, versao))
+    return FilterIndex(cube)
+
+@st.cache_resource(max_entries=2)
+def load_store(file_path=None, versao=None):
+    """
+    Abre o banco SQLite dos leads (DASHBOARD_STORE=sqlite); os dados brutos não ficam em memória
+    """
+    try:
+        return open_store(file_path)
+    except Exception as e:
+        st.error(f"Erro ao carregar o arquivo: {str(e)}")
+        return None
+
+def warm_data_cache(versao):
+    """
+    Carrega os dados usados pelos filtros, para que o primeiro filtro não espere a leitura
+    """
+    with measure('startup.aquecimento', versao=versao[:12]):
+        if STORE_BACKEND == 'sqlite':
+            load_store(versao=versao)
+        else:
+            load_data(versao=versao)
+            load_filter_index(versao=versao)
+
+@st.cache_resource(max_entries=2)
+def start_warm_up(versao):
+    """
+    Aquecimento em segundo plano, uma vez por processo e por versão dos dados
+    """
+    thread = threading.Thread(target=warm_data_cache, args=(versao,), name='dashboard-warmup', daemon=True)
+    # Contexto da sessão que disparou o aquecimento: os caches do Streamlit funcionam sem avisos na thread
+    add_script_run_ctx(thread)
+    thread.start()
+    return thread
+
+# FILTROS DE PERÍODO, CANAL E SEGMENTO
+PERIOD_KEY = 'filtro_periodo'
+
+def zoom_to_selection(opcoes):
+    """
+    Ao selecionar um trecho do gráfico diário, aplica-o como período: com menos dias,
+    a série volta a ser exibida em resolução completa
+    """
+    selecao = st.session_state.get('chart_daily_evolution')
+    caixas = (selecao or {}).get('selection', {}).get('box') or []
+    if not caixas or len(caixas[0].get('x', [])) < 2:
+        return
+    inicio, fim = sorted(pd.Timestamp(x).date() for x in caixas[0]['x'][:2])
+    inicio, fim = max(inicio, opcoes['inicio']), min(fim, opcoes['fim'])
+    if inicio <= fim:
+        st.session_state[PERIOD_KEY] = (inicio, fim)
+
+def render_filters(opcoes):
+    """
+    Mostra os filtros e retorna só os que restringem os dados (vazio = todo o histórico)
+    """
+    filtros = {}
+    if opcoes['inicio'] is None:
+        return filtros
+    
+    # O período fica só no Session State (o zoom do gráfico também o altera);
+    # volta ao histórico completo quando o intervalo dos dados muda
+    limites = (opcoes['inicio'], opcoes['fim'])
+    if st.session_state.get(f'{PERIOD_KEY}_limites') != limites:
+        st.session_state[f'{PERIOD_KEY}_limites'] = limites
+        st.session_state[PERIOD_KEY] = limites
+    
+    col_datas, col_canais, col_segmentos = st.columns([1, 1, 1])
+    with col_datas:
+        periodo = st.date_input(
+            "Período",
+            key=PERIOD_KEY,
+            min_value=opcoes['inicio'],
+            max_value=opcoes['fim'],
+            format="DD/MM/YYYY"
+        )
+    with col_canais:
+        canais = st.multiselect("Canais", opcoes['canais'], placeholder="Todos os canais")
+    with col_segmentos:
+        segmentos = st.multiselect("Segmentos", opcoes['segmentos'], placeholder="Todos os segmentos")
+    
+    # Enquanto só a data inicial foi escolhida, o período ainda não está completo
+    if isinstance(periodo, (tuple, list)) and len(periodo) == 2:
+        if periodo[0] > opcoes['inicio']:
+            filtros['inicio'] = periodo[0]
+        if periodo[1] < opcoes['fim']:
+            filtros['fim'] = periodo[1]
+    if canais:
+        filtros['canais'] = sorted(canais)
+    if segmentos:
+        filtros['segmentos'] = sorted(segmentos)
+    return filtros
+
+# CACHE DE KPIS E GRÁFICOS POR VERSÃO DOS DADOS
+def cached_kpis(df, cube=None, filtros=None, indice=None):
+    """
+    Retorna os KPIs do cache quando os dados e os filtros não mudaram
+    """
+    cache = get_result_cache()
+    chave = result_key('kpis', df, filtros)
+    with measure('cached_kpis', linhas=len(df)) as m:
+        kpis = cache.get(chave)
+        m['cache'] = 'miss' if kpis is None else 'hit'
+        if kpis is None:
+            if isinstance(df, LeadStore):
+                kpis = df.calculate_kpis(**(filtros or {}))
+            elif filtros:
+                kpis = indice.calculate_kpis(**filtros)
+            else:
+                kpis = calculate_kpis(df, cube)
+            cache.put(chave, kpis)
+    return kpis
+
+def cached_charts(df, kpis, filtros=None):
+    """
+    Retorna os gráficos já serializados (JSON do Plotly) quando os dados e os filtros não mudaram
+    """
+    cache = get_result_cache()
+    chave = result_key('charts', df, filtros)
+    with measure('cached_charts') as m:
+        charts_json = cache.get(chave)
+        m['cache'] = 'miss' if charts_json is None else 'hit'
+        if charts_json is None:
+            charts_json = serialize_charts(create_charts(kpis))
+            cache.put(chave, charts_json)
+    return {nome: json.loads(fig_json) for nome, fig_json in charts_json.items()}
+
+# ATUALIZAÇÃO EM SEGUNDO PLANO (STALE-WHILE-REVALIDATE)
+REFRESH_CHECK_INTERVAL = 30  # segundos entre verificações do Excel feitas pela página
+REFRESH_POLL_SECONDS = 2  # intervalo com que a página procura o resultado novo
+
+def _snapshot_view(snapshot):
+    """
+    Prepara o snapshot para exibição (tabelas como DataFrame, datas como date)
+    """
+    opcoes = dict(snapshot['opcoes'])
+    for chave in ('inicio', 'fim'):
+        if opcoes.get(chave):
+            opcoes[chave] = date.fromisoformat(str(opcoes[chave])[:10])
+    return {
+        **snapshot,
+        'kpis': deserialize_kpis(snapshot['kpis']),
+        'gerado_em': datetime.fromisoformat(snapshot['gerado_em']),
+        'opcoes': opcoes,
+        'digests': section_digests(snapshot)
+    }
+
+class SnapshotRefresher:
+    """
+    Mantém o último resultado válido e o recalcula numa thread quando o Excel muda.
+    A troca para o resultado novo é atômica; se o recálculo falhar, o anterior continua valendo.
+    """
+    def __init__(self, file_path, forecaster=None):
+        self.file_path = file_path
+        self.forecaster = forecaster
+        self.erro = None
+        self.versao = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._verificado = 0
+        self._pendente = False
+        self._watcher = None
+        self._snapshot = read_kpi_snapshot(file_path)
+        self._atual = _snapshot_view(self._snapshot) if self._snapshot else None
+        if self.forecaster is not None and self._snapshot is not None:
+            # Sem bloquear a primeira pintura: confere se as previsões do snapshot ainda estão no cache
+            threading.Thread(target=self.refit_missing_forecasts, name='dashboard-previsoes', daemon=True).start()
+    
+    def current(self):
+        with self._lock:
+            return self._atual
+    
+    def snapshot(self):
+        """
+        Último snapshot válido no formato serializado (o mesmo gravado em disco)
+        """
+        with self._lock:
+            return self._snapshot
+    
+    def refreshing(self):
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+    
+    def watch(self):
+        """
+        Passa a recalcular assim que o Excel muda, sem esperar uma visita à página
+        """
+        if self._watcher is None:
+            self._watcher = FileWatcher(self.file_path, lambda: self.revalidate(imediato=True)).start()
+        return self
+    
+    def revalidate(self, force=False, imediato=False):
+        """
+        Dispara o recálculo em segundo plano se o Excel mudou desde o último resultado
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                # Mudança durante o recálculo: refaz ao terminar, para não perder a última versão
+                self._pendente = self._pendente or imediato or force
+                return True
+            agora = time.monotonic()
+            if not (force or imediato) and agora - self._verificado < REFRESH_CHECK_INTERVAL:
+                return False
+            self._verificado = agora
+            if not force and self._atual is not None:
+                try:
+                    if file_signature(self.file_path) == self._atual['assinatura']:
+                        return False
+                except OSError as e:
+                    self.erro = str(e)
+                    return False
+            self._thread = threading.Thread(target=self._run, name='dashboard-refresh', daemon=True)
+            self._thread.start()
+            return True
+    
+    def refit_missing_forecasts(self):
+        """
+        Pede de novo as previsões do snapshot que não estão no cache nem em cálculo (ex.: depois de
+        reiniciar com o Excel inalterado, quando o snapshot não é recalculado). Retorna True se pediu.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None or not self.forecaster.missing(snapshot.get('previsoes') or {}):
+            return False
+        try:
+            if file_fingerprint(self.file_path)['sha256'] != snapshot['fonte']:
+                # O Excel mudou: o recálculo do snapshot já pede as previsões da versão nova
+                return False
+            with measure('refresh.previsoes') as m:
+                chaves = self.forecaster.request(forecast_series(self.file_path))
+                m['canais'] = len(chaves)
+        except Exception as e:
+            with self._lock:
+                self.erro = str(e)
+            return False
+        if chaves != snapshot['previsoes']:
+            # Modelo ou horizonte mudaram: as chaves novas passam a valer no snapshot
+            novo = {**snapshot, 'previsoes': chaves}
+            with self._lock:
+                if self._snapshot is not snapshot:
+                    return True
+                self._snapshot = novo
+                self._atual = _snapshot_view(novo)
+                self.versao += 1
+            write_kpi_snapshot(self.file_path, novo)
+        return True
+    
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+    
+    def _run(self):
+        while True:
+            self._refresh_once()
+            with self._lock:
+                if not self._pendente:
+                    return
+                self._pendente = False
+    
+    def _refresh_once(self):
+        try:
+            with measure('refresh.snapshot') as m:
+                with self._lock:
+                    anterior = self._snapshot
+                if anterior is not None and file_fingerprint(self.file_path)['sha256'] == anterior['fonte']:
+                    # Só a data de modificação mudou: mantém os resultados
+                    snapshot = {**anterior, 'assinatura': file_signature(self.file_path)}
+                    m['cache'] = 'hit'
+                else:
+                    snapshot = compute_snapshot(self.file_path, self.forecaster)
+                    m['cache'] = 'miss'
+                novo = _snapshot_view(snapshot)
+            write_kpi_snapshot(self.file_path, snapshot)
+            with self._lock:
+                self._snapshot = snapshot
+                self._atual = novo
+                self.erro = None
+                self.versao += 1
+        except Exception as e:
+            with self._lock:
+                self.erro = str(e)
+
+@st.cache_resource
+def get_forecaster():
+    """
+    Previsões por canal (pool de processos e cache em disco), uma instância por processo
+    """
+    return ForecastManager()
+
+@st.cache_resource
+def get_refresher(file_path=None):
+    """
+    Um atualizador por arquivo e por processo, compartilhado pelas sessões
+    """
+    return SnapshotRefresher(file_path or DEFAULT_FILE, get_forecaster()).watch()
+
+@st.cache_resource
+def get_api_server(_refresher):
+    """
+    API JSON somente leitura com os KPIs do atualizador, uma por processo.
+    Sem porta configurada, ou com a porta ocupada (outra instância do dashboard), fica desativada.
+    """
+    if not API_PORT:
+        return None
+    try:
+        return start_server(_refresher.snapshot)
+    except OSError:
+        return None
+
+@st.fragment(run_every=REFRESH_POLL_SECONDS)
+def watch_updates(refresher, exibido, filtrado, versao_previsoes=None):
+    """
+    Reexecuta só esta parte a cada poucos segundos: atualiza o status e, se algum agregado
+    exibido mudou ou uma previsão ficou pronta, atualiza a página (sem recarregá-la)
+    """
+    estado = refresher.current()
+    render_freshness(refresher, estado)
+    if refresher.forecaster is not None and refresher.forecaster.versao != versao_previsoes:
+        st.rerun()
+    if estado is exibido:
+        return
+    # Com filtros, qualquer versão nova dos dados pode mudar os números exibidos
+    mudou = estado['fonte'] != exibido['fonte'] if filtrado else estado['digests'] != exibido['digests']
+    if mudou:
+        st.rerun()
+
+def render_freshness(refresher, estado):
+    """
+    Mostra a idade dos dados exibidos e o andamento da atualização
+    """
+    idade = datetime.now() - estado['gerado_em']
+    minutos = int(idade.total_seconds() // 60)
+    texto_idade = "agora há pouco" if minutos < 1 else f"há {minutos} min" if minutos < 60 else f"há {minutos // 60} h {minutos % 60} min"
+    texto = f"🕒 Dados calculados em {estado['gerado_em']:%d/%m/%Y %H:%M} ({texto_idade})"
+    if refresher.refreshing():
+        texto += " · 🔄 atualizando em segundo plano..."
+    st.caption(texto)
+    if refresher.erro:
+        st.warning(f"⚠️ Não foi possível atualizar os dados ({refresher.erro}). Exibindo a última versão válida.")
+
+def filtered_results(filtros, versao):
+    """
+    KPIs e gráficos de uma visão filtrada, calculados sobre a versão `versao` dos dados
+    """
+    if STORE_BACKEND == 'sqlite':
+        # Banco embutido: os KPIs são consultas agregadas, sem o DataFrame em memória
+        with measure('load_store') as m:
+            df = load_store(versao=versao)
+            if df is not None:
+                m['linhas'] = len(df)
+        
+        if df is None:
+            return None, None
+        
+        kpis = cached_kpis(df, filtros=filtros)
+    else:
+        with measure('load_data') as m:
+            execucoes = get_metrics_log().count('load_data.execucao')
+            df = load_data(versao=versao)
+            m['cache'] = 'miss' if get_metrics_log().count('load_data.execucao') > execucoes else 'hit'
+            if df is not None:
+                m['linhas'] = len(df)
+                m['memoria_mb'] = df_memory_mb(df)
+        
+        if df is None:
+            return None, None
+        
+        # Filtros servidos pelo índice sobre o cubo, sem recortar o DataFrame
+        kpis = cached_kpis(df, load_cube(versao=versao), filtros, load_filter_index(versao=versao))
+    
+    return kpis, cached_charts(df, kpis, filtros)
+
+def render_drill_down(completa, resumida, nome, chave):
+    """
+    Tabela com todas as categorias agrupadas em OUTROS, montada só quando pedida
+    """
+    if len(completa) <= len(resumida):
+        return
+    if st.toggle(f"Ver todos os {len(completa)} {nome}", key=chave):
+        st.dataframe(completa, use_container_width=True, hide_index=True)
+
+# PREVISÃO POR CANAL
+def forecast_figure(canal, resultado):
+    """
+    Histórico recente e previsão (com faixa de incerteza) de leads e respostas de um canal
+    """
+    # Plotly só é importado quando um gráfico é montado, não na inicialização
+    import plotly.graph_objects as go
+    
+    historico = pd.DataFrame(resultado['historico'])
+    previsao = pd.DataFrame(resultado['previsao'])
+    fig = go.Figure()
+    for metrica, nome, cor, faixa in (
+        ('leads', 'Leads', '#72559a', 'rgba(114,85,154,0.15)'),
+        ('com_retorno', 'Respostas', '#2ecc71', 'rgba(46,204,113,0.15)')
+    ):
+        fig.add_trace(go.Scatter(x=previsao['DIA'], y=previsao[f'{metrica}_max'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(
+            x=previsao['DIA'], y=previsao[f'{metrica}_min'], mode='lines', line=dict(width=0),
+            fill='tonexty', fillcolor=faixa, showlegend=False, hoverinfo='skip'
+        ))
+        fig.add_trace(go.Scatter(
+            x=historico['DIA'], y=historico[metrica], mode='lines', name=nome, line=dict(color=cor, width=2),
+            hovertemplate=f'<b>Dia %{{x|%d/%m/%Y}}</b><br>{nome}: %{{y}}<extra></extra>'
+        ))
+        fig.add_trace(go.Scatter(
+            x=previsao['DIA'], y=previsao[metrica], mode='lines', name=f'{nome} (previsão)', line=dict(color=cor, width=2, dash='dash'),
+            hovertemplate=f'<b>Dia %{{x|%d/%m/%Y}}</b><br>{nome} previstos: %{{y:.1f}}<extra></extra>'
+        ))
+    fig.update_layout(
+        title=f'🔮 {canal}: histórico recente e próximos {len(previsao)} dias',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_family="Inter, -apple-system, BlinkMacSystemFont, sans-serif",
+        title_font_size=20,
+        title_font_color='#1f2937',
+        title_x=0.02,
+        margin=dict(l=40, r=40, t=60, b=40),
+        legend=dict(orientation="h", yanchor="bottom", y=1.0, xanchor="right", x=1, font=dict(size=11)),
+        xaxis=dict(type='date', showgrid=False, tickfont=dict(color='#6b7280', size=12)),
+        yaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.05)', tickfont=dict(color='#6b7280', size=12))
+    )
+    return fig
+
+def render_forecasts(forecaster, chaves):
+    """
+    Mostra as previsões já prontas; as que faltam continuam sendo calculadas em segundo plano
+    """
+    st.markdown(f'<h2 class="section-title">🔮 Previsão para os Próximos {FORECAST_HORIZON} Dias</h2>', unsafe_allow_html=True)
+    
+    prontas, pendentes, falhas = forecaster.lookup(chaves or {})
+    if not prontas:
+        if pendentes:
+            st.info(f"⏳ Calculando a previsão de {pendentes} canais em segundo plano...")
+        elif falhas:
+            render_forecast_failures(falhas)
+        elif chaves:
+            # Há canais com histórico suficiente, mas a previsão ainda não foi pedida de novo ao pool
+            st.info("⏳ Preparando a previsão dos canais em segundo plano...")
+        else:
+            st.caption(f"Histórico insuficiente para prever (mínimo de {FORECAST_MIN_DAYS} dias por canal).")
+        return
+    
+    resumo = pd.DataFrame([
+        {
+            'CANAL': canal,
+            'leads_previstos': round(sum(dia['leads'] for dia in resultado['previsao']), 1),
+            'respostas_previstas': round(sum(dia['com_retorno'] for dia in resultado['previsao']), 1)
+        }
+        for canal, resultado in prontas.items()
+    ]).sort_values('leads_previstos', ascending=False, ignore_index=True)
+    resumo['taxa_retorno_prevista'] = (resumo['respostas_previstas'] / resumo['leads_previstos'].where(resumo['leads_previstos'] > 0) * 100).round(1)
+    
+    canal = st.selectbox("Canal", resumo['CANAL'], key='previsao_canal')
+    with measure('render.forecast'):
+        st.plotly_chart(forecast_figure(canal, prontas[canal]), use_container_width=True, key='chart_forecast')
+    st.dataframe(resumo, use_container_width=True, hide_index=True)
+    
+    modelos = sorted({resultado['modelo'] for resultado in prontas.values()})
+    texto = f"Modelo: {', '.join(modelos)}"
+    if pendentes:
+        texto += f" · {pendentes} canais ainda em cálculo"
+    st.caption(texto)
+    if falhas:
+        render_forecast_failures(falhas)
+
+def render_forecast_failures(falhas):
+    """
+    Canais cujo ajuste falhou, com o erro de cada um (são reajustados quando os dados mudarem)
+    """
+    detalhes = '; '.join(f"{canal}: {erro}" for canal, erro in sorted(falhas.items()))
+    st.warning(f"⚠️ Não foi possível calcular a previsão de {len(falhas)} canais ({detalhes}). Será tentado de novo quando os dados mudarem.")
+
+# PAINEL DE DIAGNÓSTICO
+def render_diagnostics():
+    """
+    Mostra os tempos por etapa, o uso do cache e o consumo de memória registrados no processo
+    """
+    st.markdown('<h2 class="section-title">🩺 Diagnóstico de Desempenho</h2>', unsafe_allow_html=True)
+    
+    registros = pd.DataFrame(get_metrics_log().recent())
+    if registros.empty:
+        st.info("Nenhuma métrica registrada ainda.")
+        return
+    
+    resumo = registros.groupby('etapa').agg(
+        execucoes=('segundos', 'size'),
+        ultimo_s=('segundos', 'last'),
+        medio_s=('segundos', 'mean'),
+        maximo_s=('segundos', 'max')
+    ).sort_values('maximo_s', ascending=False)
+    
+    col_left, col_right = st.columns([2, 1])
+    with col_left:
+        st.dataframe(resumo, use_container_width=True)
+        if 'orcamento_s' in registros.columns:
+            inicializacao = registros.dropna(subset=['orcamento_s'])
+            if not inicializacao.empty:
+                st.caption("Inicialização deste processo, comparada ao orçamento (segundos)")
+                st.dataframe(
+                    inicializacao[['etapa', 'segundos', 'orcamento_s', 'dentro_do_orcamento']],
+                    use_container_width=True,
+                    hide_index=True
+                )
+    with col_right:
+        st.json(get_result_cache().stats())
+        st.caption(f"Métricas gravadas em `{METRICS_FILE}`")
+        servidor = get_api_server(get_refresher())
+        if servidor is not None:
+            host, port = servidor.server_address[:2]
+            st.caption(f"API de KPIs em `http://{host}:{port}/kpis`")
+    
+    with st.expander("Registros recentes"):
+        st.dataframe(registros.iloc[::-1], use_container_width=True)
+
+# INTERFACE PRINCIPAL
+def main():
+    # TÍTULO PRINCIPAL
+    st.markdown('<h1 class="main-title">📊 Dashboard Comercial Rankrup</h1>', unsafe_allow_html=True)
+    
+    try:
+        # Exibe o último resultado válido na hora; o recálculo roda em segundo plano
+        refresher = get_refresher()
+        get_api_server(refresher)
+        estado = refresher.current()
+        if estado is None:
+            # Primeira execução sem snapshot em disco: não há o que mostrar enquanto calcula
+            with st.spinner("Carregando dados..."):
+                refresher.revalidate(force=True)
+                refresher.wait()
+            estado = refresher.current()
+            if estado is None:
+                st.error(f"Erro ao carregar o arquivo: {refresher.erro}")
+                return
+        else:
+            refresher.revalidate()
+        
+        filtros = render_filters(estado['opcoes'])
+        watch_updates(refresher, estado, bool(filtros), refresher.forecaster.versao if refresher.forecaster else None)
+        if filtros:
+            kpis, charts = filtered_results(filtros, estado['fonte'])
+            if kpis is None:
+                return
+        else:
+            kpis, charts = estado['kpis'], estado['charts']
+        
+        # SEÇÃO 1: KPIs PRINCIPAIS
+        st.markdown('<h2 class="section-title">📈 KPIs Principais</h2>', unsafe_allow_html=True)
+        
+        for coluna, (chave, rotulo, estilo, sufixo) in zip(st.columns(len(KPI_CARDS)), KPI_CARDS):
+            with coluna:
+                st.markdown(f"""
+                <div class="{estilo}">
+                    <div class="metric-number">{kpis[chave]}{sufixo}</div>
+                    <div class="metric-label">{rotulo}</div>
+                </div>
+                """, unsafe_allow_html=True)
+        
+        # Cartões na tela: fecha a medida de primeira pintura e aquece os dados dos filtros em segundo plano
+        record_startup('startup.primeira_pintura', time.perf_counter() - _INICIO_SCRIPT)
+        start_warm_up(estado['fonte'])
+        
+        # JANELAS MÓVEIS: leads e taxas dos últimos 7/30/90 dias
+        if not kpis['janelas_moveis'].empty:
+            colunas = st.columns(len(kpis['janelas_moveis']))
+            for coluna, janela in zip(colunas, kpis['janelas_moveis'].itertuples()):
+                with coluna:
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-number">{janela.leads}</div>
+                        <div class="metric-label">Leads nos Últimos {janela.janela} Dias<br>{janela.taxa_retorno:.1f}% de retorno · {janela.taxa_positiva:.1f}% positivas</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+            
+            if st.toggle("Ver janelas por canal", key='drill_janelas'):
+                tabela = kpis['janelas_moveis_por_canal'].pivot(
+                    index='CANAL', columns='janela', values=['leads', 'taxa_retorno', 'taxa_positiva']
+                )
+                tabela.columns = [f"{medida} ({janela}d)" for medida, janela in tabela.columns]
+                st.dataframe(tabela, use_container_width=True)
+        
+        # SEÇÃO 2: GRÁFICOS ANALÍTICOS
+        st.markdown('<h2 class="section-title">📊 Análises Detalhadas</h2>', unsafe_allow_html=True)
+        
+        # Layout dos gráficos
+        col_left, col_right = st.columns([2, 1])
+        
+        with col_left:
+            if 'daily_evolution' in charts:
+                with measure('render.daily_evolution'):
+                    amostragem = charts['daily_evolution']['layout'].get('meta') or {}
+                    reduzido = amostragem.get('pontos', 0) < amostragem.get('pontos_originais', 0)
+                    # Série reduzida: selecionar um trecho aplica o período e traz todos os dias dele
+                    st.plotly_chart(
+                        charts['daily_evolution'],
+                        use_container_width=True,
+                        key='chart_daily_evolution',
+                        on_select=(lambda: zoom_to_selection(estado['opcoes'])) if reduzido else 'ignore',
+                        selection_mode='box'
+                    )
+                    if reduzido:
+                        st.caption(
+                            f"Exibindo {amostragem['pontos']} de {amostragem['pontos_originais']} dias (amostragem LTTB). "
+                            "Selecione um trecho do gráfico ou ajuste o período para ver todos os dias."
+                        )
+        
+        with col_right:
+            if 'channel_performance' in charts:
+                with measure('render.channel_performance'):
+                    st.plotly_chart(charts['channel_performance'], use_container_width=True, key='chart_channel_performance')
+                render_drill_down(kpis['canal_performance'], kpis['canal_performance_top'], 'canais', 'drill_canais')
+        
+        # Gráfico de segmentos (largura total)
+        if 'segments_no_response' in charts:
+            with measure('render.segments_no_response'):
+                st.plotly_chart(charts['segments_no_response'], use_container_width=True, key='chart_segments_no_response')
+            render_drill_down(kpis['sem_resposta_por_segmento'], kpis['sem_resposta_por_segmento_top'], 'segmentos', 'drill_segmentos')
+        
+        # SEÇÃO 3: INSIGHTS AUTOMÁTICOS
+        st.markdown('<h2 class="section-title">💡 Insights Automáticos</h2>', unsafe_allow_html=True)
+        
+        nivel, texto = build_insights(kpis)
+        if nivel == 'info':
+            st.info(texto)
+        else:
+            st.warning(texto)
+        
+        # SEÇÃO 4: PREVISÃO POR CANAL (todo o histórico, independente dos filtros)
+        if refresher.forecaster is not None:
+            render_forecasts(refresher.forecaster, estado.get('previsoes'))
+        
+        # PAINEL DE DIAGNÓSTICO (oculto; abrir com ?diagnostico=1)
+        if st.query_params.get(DIAGNOSTICS_PARAM) in ('1', 'true'):
+            render_diagnostics()
+        
+    except FileNotFoundError:
+        st.error("❌ **Arquivo não encontrado!**")
+        st.markdown("""
+        **Verifique se:**
+        - O arquivo `dashboard_rank.xlsx` existe na pasta especificada
+        - O caminho está correto
+        - Você tem permissão para acessar o arquivo
+        """)
+        
+    except Exception as e:
+        st.error(f"❌ **Erro ao carregar o arquivo:** {str(e)}")
+        st.markdown("**Detalhes do erro podem ajudar na identificação do problema.**")
+        st.write("Erro detalhado:", str(e))
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        # Uma gravação do arquivo de métricas por execução do script
+        get_metrics_log().flush()
@@ -0,0 +1,118 @@
+# Gerador de Planilhas Sintéticas de Leads
+# Cria planilhas no mesmo formato de dashboard_rank.xlsx para testes de escala
+#
+# Uso:
+#   python generate_leads.py --rows 100000 --output leads_100k.xlsx
+#   python generate_leads.py --rows 5000000 --channels 6 --segments 40 --days 1095 --output leads_5m.parquet
+
+import argparse
+import numpy as np
+import pandas as pd
+
+# Limite de linhas de uma aba do Excel (descontando o cabeçalho)
+XLSX_MAX_ROWS = 1048575
+
+CANAIS_BASE = ['Linkedin', 'Whatsapp', 'Email', 'Instagram', 'Telefone', 'Indicação']
+SEGMENTOS_BASE = ['Agencia', 'B2B', 'Freelancer', 'Ecommerce', 'Startup', 'Varejo', 'Industria', 'Saude']
+
+# Distribuição próxima da planilha real: a maioria não responde
+RESULTADOS_PADRAO = {
+    'Não Respondeu': 0.80,
+    'Visualizou e não respondeu': 0.08,
+    'Negativo': 0.06,
+    'Respondeu e Marcou Call': 0.03,
+    'Positivo': 0.02,
+    'Interessado': 0.01
+}
+
+def _nomes(base, quantidade, prefixo):
+    """
+    Usa os nomes conhecidos e completa com nomes numerados quando precisar de mais
+    """
+    nomes = base[:quantidade]
+    nomes += [f"{prefixo} {i}" for i in range(len(nomes) + 1, quantidade + 1)]
+    return nomes
+
+def generate_leads(rows, channels=2, segments=3, days=90, result_mix=None,
+                   start_date='2025-01-01', invalid_date_rate=0.001, seed=0):
+    """
+    Gera um DataFrame bruto de leads com as colunas da planilha original
+    """
+    rng = np.random.default_rng(seed)
+    result_mix = result_mix or RESULTADOS_PADRAO
+    resultados = list(result_mix)
+    pesos = np.array([result_mix[r] for r in resultados], dtype=float)
+
+    canais = _nomes(CANAIS_BASE, channels, 'Canal')
+    segmentos = _nomes(SEGMENTOS_BASE, segments, 'Segmento')
+    # Canais e segmentos com popularidades diferentes, como na prática
+    pesos_canais = rng.dirichlet(np.ones(channels) * 2)
+    pesos_segmentos = rng.dirichlet(np.ones(segments))
+
+    # Planilha só recebe linhas novas no final: datas em ordem crescente
+    dias = np.sort(rng.integers(0, days, rows))
+    datas = pd.Timestamp(start_date) + pd.to_timedelta(dias, unit='D')
+
+    df = pd.DataFrame({
+        'ID_LEAD': np.arange(1, rows + 1),
+        'DATA_ABORDAGEM': datas,
+        'SEGMENTO': pd.Categorical.from_codes(rng.choice(segments, rows, p=pesos_segmentos), segmentos),
+        'CANAL': pd.Categorical.from_codes(rng.choice(channels, rows, p=pesos_canais), canais),
+        'RESULTADO': pd.Categorical.from_codes(rng.choice(len(resultados), rows, p=pesos / pesos.sum()), resultados)
+    })
+
+    # Algumas datas em branco, descartadas pela limpeza do dashboard
+    if invalid_date_rate > 0:
+        df.loc[rng.random(rows) < invalid_date_rate, 'DATA_ABORDAGEM'] = pd.NaT
+
+    return df
+
+def write_leads(df, output):
+    """
+    Grava em .xlsx (como a planilha real) ou em formato colunar (.parquet / .arrow)
+    """
+    if output.endswith('.xlsx'):
+        if len(df) > XLSX_MAX_ROWS:
+            raise ValueError(f"O Excel aceita no máximo {XLSX_MAX_ROWS} linhas por aba; use .parquet")
+        df.to_excel(output, index=False)
+    elif output.endswith('.parquet'):
+        df.to_parquet(output, index=False)
+    elif output.endswith('.arrow') or output.endswith('.feather'):
+        df.to_feather(output)
+    else:
+        raise ValueError(f"Formato não suportado: {output}")
+
+def _parse_mix(texto):
+    """
+    Converte 'Não Respondeu=0.7,Positivo=0.3' em dicionário de pesos
+    """
+    mix = {}
+    for parte in texto.split(','):
+        nome, peso = parte.rsplit('=', 1)
+        mix[nome.strip()] = float(peso)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas de leads")
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--segments', type=int, default=3)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--start-date', default='2025-01-01')
+    parser.add_argument('--mix', type=_parse_mix, default=None,
+                        help="Distribuição de RESULTADO, ex.: 'Não Respondeu=0.7,Negativo=0.2,Positivo=0.1'")
+    parser.add_argument('--invalid-date-rate', type=float, default=0.001)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help="Arquivo .xlsx, .parquet ou .arrow")
+    args = parser.parse_args()
+
+    df = generate_leads(
+        args.rows, channels=args.channels, segments=args.segments, days=args.days,
+        result_mix=args.mix, start_date=args.start_date,
+        invalid_date_rate=args.invalid_date_rate, seed=args.seed
+    )
+    write_leads(df, args.output)
+    print(f"{len(df)} leads gravados em {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# API de KPIs (somente leitura)
+# Expõe em JSON os KPIs já calculados pelo dashboard, sem recalcular nada e sem passar pelo Streamlit.
+# Cada resposta leva um ETag forte derivado do próprio corpo: clientes que consultam
+# periodicamente com If-None-Match recebem 304 (sem corpo) enquanto a resposta não muda.
+#
+# Uso:
+#   O dashboard inicia a API no mesmo processo (porta em DASHBOARD_API_PORT; vazio desativa)
+#   python kpi_api.py                                  # lê o snapshot gravado pelo dashboard
+#   python kpi_api.py planilha.xlsx --port 8502
+#
+# Rotas: /kpis (todos os KPIs), /kpis/canais, /kpis/segmentos
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from kpi_engine import DEFAULT_FILE, KPI_SNAPSHOT_SUFFIX, file_signature, read_kpi_snapshot
+
+API_HOST = os.environ.get('DASHBOARD_API_HOST', '127.0.0.1')
+API_PORT = os.environ.get('DASHBOARD_API_PORT', '8502')
+
+# Rota -> KPIs incluídos (None: todos)
+API_ROUTES = {
+    '/kpis': None,
+    '/kpis/canais': ['canal_performance', 'canal_performance_top', 'janelas_moveis_por_canal'],
+    '/kpis/segmentos': ['sem_resposta_por_segmento', 'sem_resposta_por_segmento_top']
+}
+
+def payload_etag(corpo):
+    """
+    ETag forte: hash do corpo já codificado (muda com qualquer campo da resposta, inclusive gerado_em)
+    """
+    return f'"{hashlib.sha256(corpo).hexdigest()[:32]}"'
+
+def etag_matches(if_none_match, etag):
+    """
+    Comparação fraca do If-None-Match (RFC 9110): aceita a lista de ETags, W/ e *
+    """
+    if not if_none_match:
+        return False
+    for valor in if_none_match.split(','):
+        valor = valor.strip()
+        if valor == '*' or valor.removeprefix('W/') == etag:
+            return True
+    return False
+
+def build_payloads(snapshot):
+    """
+    ETag e corpo JSON já codificado de cada rota, gerados uma vez por snapshot
+    """
+    kpis = snapshot['kpis']
+    base = {'fonte': snapshot['fonte'], 'gerado_em': snapshot['gerado_em']}
+    payloads = {}
+    for rota, nomes in API_ROUTES.items():
+        dados = kpis if nomes is None else {nome: kpis.get(nome, []) for nome in nomes}
+        corpo = json.dumps({**base, 'kpis': dados}, ensure_ascii=False).encode('utf-8')
+        payloads[rota] = (payload_etag(corpo), corpo)
+    return payloads
+
+class KpiApi:
+    """
+    Responde às rotas a partir do snapshot atual (`get_snapshot` retorna o snapshot ou None)
+    """
+    def __init__(self, get_snapshot):
+        self.get_snapshot = get_snapshot
+        self._snapshot = None
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def respond(self, caminho, if_none_match=None):
+        """
+        Retorna (status, cabeçalhos, corpo)
+        """
+        rota = urlsplit(caminho).path.rstrip('/')
+        if rota not in API_ROUTES:
+            return 404, {}, json.dumps({'erro': 'rota não encontrada', 'rotas': list(API_ROUTES)}, ensure_ascii=False).encode('utf-8')
+
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            # Ainda não há resultado calculado
+            return 503, {'Retry-After': '5'}, json.dumps({'erro': 'KPIs ainda não calculados'}, ensure_ascii=False).encode('utf-8')
+
+        # O snapshot é sempre substituído, nunca alterado: a identidade basta para reaproveitar os corpos
+        with self._lock:
+            if snapshot is not self._snapshot:
+                self._payloads = build_payloads(snapshot)
+                self._snapshot = snapshot
+            etag, corpo = self._payloads[rota]
+
+        cabecalhos = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag_matches(if_none_match, etag):
+            return 304, cabecalhos, b''
+        return 200, cabecalhos, corpo
+
+class KpiRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'KpiApi/1.0'
+
+    def _send(self, com_corpo=True):
+        status, cabecalhos, corpo = self.server.api.respond(self.path, self.headers.get('If-None-Match'))
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        if com_corpo and status != 304:
+            self.wfile.write(corpo)
+
+    def do_GET(self):
+        self._send()
+
+    def do_HEAD(self):
+        self._send(com_corpo=False)
+
+    def log_message(self, format, *args):
+        # Dentro do dashboard, as consultas periódicas não poluem o terminal
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def start_server(get_snapshot, host=API_HOST, port=API_PORT, verbose=False):
+    """
+    Inicia a API numa thread em segundo plano e retorna o servidor (OSError se a porta estiver ocupada)
+    """
+    servidor = ThreadingHTTPServer((host, int(port)), KpiRequestHandler)
+    servidor.daemon_threads = True
+    servidor.api = KpiApi(get_snapshot)
+    servidor.verbose = verbose
+    threading.Thread(target=servidor.serve_forever, name='kpi-api', daemon=True).start()
+    return servidor
+
+class SnapshotFile:
+    """
+    Snapshot gravado pelo dashboard ao lado do Excel, relido só quando o arquivo muda
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._assinatura = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        try:
+            assinatura = file_signature(f"{self.file_path}{KPI_SNAPSHOT_SUFFIX}")
+        except OSError:
+            return None
+        with self._lock:
+            if assinatura != self._assinatura:
+                self._snapshot = read_kpi_snapshot(self.file_path)
+                self._assinatura = assinatura
+            return self._snapshot
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve em JSON os KPIs calculados pelo dashboard")
+    parser.add_argument('arquivo', nargs='?', default=DEFAULT_FILE, help="Planilha do dashboard (.xlsx)")
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=int(API_PORT or 8502))
+    args = parser.parse_args()
+
+    servidor = start_server(SnapshotFile(args.arquivo), args.host, args.port, verbose=True)
+    print(f"API de KPIs em http://{args.host}:{servidor.server_address[1]}{next(iter(API_ROUTES))}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1537 @@
+# Motor de KPIs de Leads
+# Limpeza, classificação, caches e cálculo dos KPIs, sem depender do Streamlit.
+# Usado pelo dashboard e pelos processamentos em lote.
+
+import atexit
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Observação do Excel por inotify/FSEvents; sem o watchdog, cai na verificação periódica
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# CLASSIFICAÇÃO DAS RESPOSTAS
+RESPOSTAS_POSITIVAS = ['RESPONDEU E MARCOU CALL', 'POSITIVO', 'INTERESSADO']
+RESPOSTAS_EFETIVAS = ['RESPONDEU E MARCOU CALL', 'NEGATIVO', 'POSITIVO', 'INTERESSADO']
+SEM_RESPOSTA = ['NÃO RESPONDEU', 'VISUALIZOU E NÃO RESPONDEU']
+
+# INSTRUMENTAÇÃO DE DESEMPENHO
+METRICS_FILE = os.environ.get('DASHBOARD_METRICS_FILE', 'dashboard_metrics.jsonl')
+METRICS_MAX_RECORDS = 500
+# Gravação em lote: os registros vão para o arquivo a cada N registros ou T segundos (e ao fim de cada execução)
+METRICS_FLUSH_RECORDS = 200
+METRICS_FLUSH_SECONDS = 5
+# Acima deste tamanho, o arquivo vira .1 (substituindo o anterior) e um novo é iniciado
+METRICS_MAX_BYTES = 5 * 1024 * 1024
+
+class MetricsLog:
+    """
+    Registros recentes de tempo por etapa do processo, também gravados em JSONL para o monitoramento
+    """
+    def __init__(self, path=METRICS_FILE, maxlen=METRICS_MAX_RECORDS, max_bytes=METRICS_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.registros = deque(maxlen=maxlen)
+        self.contagem = Counter()
+        self._pendentes = []
+        self._ultima_gravacao = time.monotonic()
+        self._lock = threading.Lock()
+        self._arquivo_lock = threading.Lock()
+    
+    def add(self, registro):
+        with self._lock:
+            self.registros.append(registro)
+            self.contagem[registro['etapa']] += 1
+            if not self.path:
+                return
+            self._pendentes.append(registro)
+            gravar = (
+                len(self._pendentes) >= METRICS_FLUSH_RECORDS
+                or time.monotonic() - self._ultima_gravacao >= METRICS_FLUSH_SECONDS
+            )
+        if gravar:
+            self.flush()
+    
+    def flush(self):
+        """
+        Grava no arquivo os registros pendentes, rotacionando-o quando passa de max_bytes
+        """
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, []
+            self._ultima_gravacao = time.monotonic()
+        if not pendentes or not self.path:
+            return
+        texto = ''.join(json.dumps(r, ensure_ascii=False, default=str) + '\n' for r in pendentes)
+        with self._arquivo_lock:
+            try:
+                if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) + len(texto) > self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(texto)
+            except OSError:
+                # Sem permissão de escrita, as métricas ficam só em memória
+                pass
+    
+    def count(self, etapa):
+        with self._lock:
+            return self.contagem[etapa]
+    
+    def recent(self):
+        with self._lock:
+            return list(self.registros)
+
+_metrics_log = MetricsLog()
+# Registros ainda no buffer são gravados ao encerrar o processo
+atexit.register(_metrics_log.flush)
+
+def get_metrics_log():
+    """
+    Instância única do registro de métricas por processo
+    """
+    return _metrics_log
+
+# ORÇAMENTO DE INICIALIZAÇÃO (segundos): importações e tempo até os cartões aparecerem
+STARTUP_BUDGET = {
+    'startup.imports': 1.5,
+    'startup.primeira_pintura': 2.0
+}
+_startup_registrado = set()
+_startup_lock = threading.Lock()
+
+def record_startup(etapa, segundos):
+    """
+    Registra uma medida de inicialização uma única vez por processo, comparada ao orçamento
+    """
+    with _startup_lock:
+        if etapa in _startup_registrado:
+            return None
+        _startup_registrado.add(etapa)
+    orcamento = STARTUP_BUDGET.get(etapa)
+    registro = {
+        'etapa': etapa,
+        'segundos': round(segundos, 6),
+        'orcamento_s': orcamento,
+        'dentro_do_orcamento': orcamento is None or segundos <= orcamento,
+        'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+        'pid': os.getpid()
+    }
+    get_metrics_log().add(registro)
+    return registro
+
+def df_memory_mb(df):
+    return round(df.memory_usage(deep=True).sum() / 1024 / 1024, 3)
+
+@contextmanager
+def measure(etapa, **campos):
+    """
+    Mede o tempo de uma etapa; o bloco pode completar o registro (linhas, cache, memoria_mb)
+    """
+    registro = {'etapa': etapa, **campos}
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro['segundos'] = round(time.perf_counter() - inicio, 6)
+        registro['timestamp'] = datetime.now().isoformat(timespec='milliseconds')
+        registro['pid'] = os.getpid()
+        get_metrics_log().add(registro)
+
+# CACHE COLUNAR (PARQUET) AO LADO DO EXCEL
+SIDECAR_SUFFIX = '.cache.parquet'
+SIDECAR_META_KEY = b'dashboard_fonte'
+# Incrementar sempre que o esquema do DataFrame limpo ou do cubo mudar
+SIDECAR_VERSION = 4
+
+# INGESTÃO INCREMENTAL: a planilha só recebe linhas novas no final
+INCREMENTAL_INGEST = True
+
+# LEITURA EM BLOCOS: quem consome os blocos sem juntá-los (stream_cube, usado pelo lote, e o banco SQLite)
+# tem pico de memória dado pelo bloco, não pelo arquivo; a carga do DataFrame completo junta todos
+STREAM_CHUNK_ROWS = 50000
+
+def normalize_text(series):
+    """
+    Converte uma coluna de texto em categórica, normalizando cada valor distinto uma única vez.
+    Células vazias continuam ausentes (código -1) em qualquer versão do pandas.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    uniques = pd.Index(uniques)
+    # Mascara as ausências explicitamente: antes do pandas 3, astype(str) as transformava no texto 'nan'
+    normalizados = uniques.astype(str).str.strip().str.upper().where(uniques.notna())
+    categorias = normalizados.dropna().unique().sort_values()
+    novos_codes = categorias.get_indexer(normalizados)[codes]
+    return pd.Series(
+        pd.Categorical.from_codes(novos_codes, categories=categorias),
+        index=series.index,
+        name=series.name
+    )
+
+def clean_data(df):
+    """
+    Aplica a limpeza e a classificação das respostas sobre os dados brutos
+    """
+    # LIMPEZA E FORMATAÇÃO DOS DADOS
+    with measure('clean_data.datas', linhas=len(df)):
+        df['DATA_ABORDAGEM'] = pd.to_datetime(df['DATA_ABORDAGEM'], errors='coerce')
+        df = df.dropna(subset=['DATA_ABORDAGEM'])
+    
+    with measure('clean_data.texto', linhas=len(df)):
+        text_columns = ['SEGMENTO', 'CANAL', 'RESULTADO']
+        for col in text_columns:
+            if col in df.columns:
+                df[col] = normalize_text(df[col])
+    
+    # CORREÇÃO 1: Criar campo para evolução DIÁRIA em vez de mensal
+    with measure('clean_data.derivadas', linhas=len(df)):
+        df['DIA'] = df['DATA_ABORDAGEM'].dt.normalize()
+        df['MES_ANO'] = df['DATA_ABORDAGEM'].dt.to_period('M')
+        
+        # CORREÇÃO 2: Lógica corrigida para classificação de respostas
+        df['TEVE_RETORNO'] = ~df['RESULTADO'].isin(SEM_RESPOSTA)
+        df['RESPOSTA_POSITIVA'] = df['RESULTADO'].isin(RESPOSTAS_POSITIVAS)
+        df['RESPOSTA_EFETIVA'] = df['RESULTADO'].isin(RESPOSTAS_EFETIVAS)
+    
+    return df
+
+def concat_clean(frames):
+    """
+    Junta DataFrames já limpos preservando as colunas categóricas
+    """
+    frames = [f for f in frames if f is not None]
+    # Blocos vazios não devem alterar os tipos das colunas
+    if any(not f.empty for f in frames):
+        frames = [f for f in frames if not f.empty]
+    if len(frames) == 1:
+        return frames[0]
+    for col in ['SEGMENTO', 'CANAL', 'RESULTADO']:
+        if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            categorias = frames[0][col].cat.categories
+            for f in frames[1:]:
+                categorias = categorias.union(f[col].cat.categories)
+            frames = [f.assign(**{col: f[col].cat.set_categories(categorias)}) for f in frames]
+    return pd.concat(frames)
+
+# CUBO DE CONTAGENS USADO PELOS KPIS
+CUBE_DIMENSIONS = ['DIA', 'CANAL', 'SEGMENTO', 'RESULTADO']
+CUBE_SOURCE_COLUMNS = ['DATA_ABORDAGEM', 'CANAL', 'SEGMENTO', 'RESULTADO']
+
+def _plain_index(serie):
+    """
+    Troca níveis categóricos do índice por texto simples, para que cubos de origens diferentes se somem
+    """
+    if isinstance(serie.index, pd.MultiIndex):
+        serie.index = serie.index.set_levels([
+            nivel.astype(str) if isinstance(nivel, pd.CategoricalIndex) else nivel
+            for nivel in serie.index.levels
+        ])
+    elif isinstance(serie.index, pd.CategoricalIndex):
+        serie.index = serie.index.astype(str)
+    return serie
+
+def build_cube(df):
+    """
+    Conta os leads por DIA x CANAL x SEGMENTO x RESULTADO (só as combinações existentes).
+    O cubo guarda em attrs['fingerprint'] o sha256 do Excel de origem do DataFrame, quando conhecido.
+    """
+    dimensoes = [col for col in CUBE_DIMENSIONS if col in df.columns]
+    cube = _plain_index(df.groupby(dimensoes, observed=True, dropna=False).size()).astype('int64')
+    cube.attrs = {'fingerprint': df.attrs.get('fingerprint')}
+    return cube
+
+def merge_cubes(base, novo):
+    """
+    Soma o cubo das linhas novas ao cubo já acumulado (células com dimensão vazia também se somam)
+    """
+    return pd.concat([base, novo]).groupby(level=list(base.index.names), dropna=False).sum().astype('int64').sort_index()
+
+def slice_cube(cube, **filtros):
+    """
+    Recorta o cubo por valores de dimensão, ex.: slice_cube(cube, CANAL=['LINKEDIN'])
+    """
+    mascara = np.ones(len(cube), dtype=bool)
+    for dimensao, valores in filtros.items():
+        mascara &= cube.index.get_level_values(dimensao).isin(valores)
+    return cube[mascara]
+
+def _cube_to_json(cube):
+    registros = []
+    for chave, valor in zip(cube.index.tolist(), cube.tolist()):
+        chave = chave if isinstance(chave, tuple) else (chave,)
+        registros.append([c.strftime('%Y-%m-%d') if isinstance(c, pd.Timestamp) else c for c in chave] + [int(valor)])
+    return {'dimensoes': list(cube.index.names), 'celulas': registros}
+
+def _cube_from_json(dados):
+    dimensoes = dados['dimensoes']
+    tabela = pd.DataFrame(dados['celulas'], columns=[*dimensoes, 'quantidade'])
+    tabela['DIA'] = pd.to_datetime(tabela['DIA'])
+    return tabela.set_index(dimensoes)['quantidade'].rename(None).astype('int64')
+
+def file_fingerprint(file_path):
+    """
+    Identifica a versão do arquivo por tamanho, data de modificação e hash do conteúdo
+    """
+    stat = os.stat(file_path)
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha.hexdigest()
+    }
+
+def _sidecar_path(file_path):
+    return f"{file_path}{SIDECAR_SUFFIX}"
+
+def _temp_path(path):
+    """
+    Cria um arquivo temporário vazio e exclusivo ao lado de `path`: gravações concorrentes do mesmo arquivo
+    não apagam nem sobrescrevem o temporário umas das outras (o último os.replace vence)
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix='.tmp', dir=os.path.dirname(path) or '.')
+    os.close(fd)
+    return tmp_path
+
+def _read_sidecar_metadata(file_path):
+    """
+    Lê apenas os metadados do cache colunar (fonte, watermark e cubo)
+    """
+    path = _sidecar_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+        dados = json.loads(metadata.get(SIDECAR_META_KEY, b'null'))
+        if not dados or dados.get('versao') != SIDECAR_VERSION:
+            return None
+        return dados
+    except Exception:
+        # Cache corrompido ou ilegível: volta para a leitura do Excel
+        return None
+
+def _read_sidecar(file_path):
+    """
+    Lê o cache colunar completo, retornando (df, metadados)
+    """
+    dados = _read_sidecar_metadata(file_path)
+    if dados is None:
+        return None, None
+    try:
+        return pq.read_table(_sidecar_path(file_path)).to_pandas(), dados
+    except Exception:
+        return None, None
+
+def _write_sidecar(df, file_path, fingerprint, cube, watermark=None):
+    """
+    Grava o DataFrame já limpo em Parquet, com a fonte, o watermark e o cubo nos metadados
+    """
+    path = _sidecar_path(file_path)
+    tmp_path = None
+    try:
+        tmp_path = _temp_path(path)
+        table = pa.Table.from_pandas(df)
+        metadata = dict(table.schema.metadata or {})
+        metadata[SIDECAR_META_KEY] = json.dumps({
+            'versao': SIDECAR_VERSION,
+            'fonte': fingerprint,
+            'watermark': watermark,
+            'cubo': _cube_to_json(cube)
+        }).encode()
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        # Falha ao gravar o cache não deve impedir o carregamento
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _iter_sheet_rows(file_path, aba=None):
+    """
+    Percorre as linhas não vazias de uma aba (por padrão, a primeira) sem carregar a planilha inteira
+    """
+    # openpyxl só é importado quando o Excel precisa ser lido (fora do caminho da primeira pintura)
+    from openpyxl import load_workbook
+    
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        planilha = wb[aba] if aba is not None else wb.worksheets[0]
+        for row in planilha.iter_rows(values_only=True):
+            if any(valor is not None for valor in row):
+                yield row
+    finally:
+        wb.close()
+
+def stream_clean_chunks(file_path, watermark=None, chunk_rows=None, usecols=None, progresso=None, aba=None):
+    """
+    Lê a aba `aba` (por padrão, a primeira) em blocos de `chunk_rows` linhas e entrega cada bloco já limpo.
+    Linhas até o watermark só entram no hash; se ele não bater, a leitura para e
+    progresso['prefixo_alterado'] fica True. No fim, progresso['watermark'] traz o novo watermark.
+    """
+    if chunk_rows is None:
+        chunk_rows = STREAM_CHUNK_ROWS
+    if progresso is None:
+        progresso = {}
+    progresso['prefixo_alterado'] = False
+    
+    processadas = watermark['linhas'] if watermark else 0
+    rows = _iter_sheet_rows(file_path, aba)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("A planilha está vazia")
+    
+    # Descarta cedo as colunas que não serão usadas
+    colunas = list(header)
+    posicoes = None
+    if usecols is not None:
+        posicoes = [colunas.index(col) for col in usecols if col in colunas]
+        colunas = [colunas[i] for i in posicoes]
+    
+    def montar(bloco, inicio):
+        if posicoes is not None:
+            bloco = [[row[i] for i in posicoes] for row in bloco]
+        df = pd.DataFrame(bloco, columns=colunas, index=pd.RangeIndex(inicio, inicio + len(bloco)))
+        return clean_data(df.infer_objects())
+    
+    sha = hashlib.sha256(repr(header).encode())
+    if watermark and processadas == 0 and sha.hexdigest() != watermark['prefixo_sha256']:
+        progresso['prefixo_alterado'] = True
+        return
+    
+    bloco = []
+    inicio = processadas
+    total = 0
+    for row in rows:
+        sha.update(repr(row).encode())
+        total += 1
+        if total > processadas:
+            bloco.append(row)
+            if len(bloco) == chunk_rows:
+                yield montar(bloco, inicio)
+                inicio += len(bloco)
+                bloco = []
+        elif total == processadas and sha.hexdigest() != watermark['prefixo_sha256']:
+            progresso['prefixo_alterado'] = True
+            return
+    
+    # Linhas removidas também invalidam o acumulado
+    if total < processadas:
+        progresso['prefixo_alterado'] = True
+        return
+    
+    # Sempre entrega ao menos um bloco, mesmo vazio, para preservar as colunas
+    if bloco or inicio == processadas:
+        yield montar(bloco, inicio)
+    progresso['watermark'] = {'linhas': total, 'prefixo_sha256': sha.hexdigest()}
+
+def _read_sheet(file_path, watermark=None):
+    """
+    Lê e limpa as linhas posteriores ao watermark.
+    Retorna (df, novo_watermark), ou None se alguma linha antiga foi alterada.
+    """
+    progresso = {}
+    blocos = list(stream_clean_chunks(file_path, watermark=watermark, progresso=progresso))
+    if progresso['prefixo_alterado']:
+        return None
+    return concat_clean(blocos), progresso['watermark']
+
+def stream_cube(file_path, chunk_rows=None):
+    """
+    Monta só o cubo de contagens lendo as colunas do cubo em blocos de `chunk_rows` linhas:
+    a memória fica limitada pelo bloco e não pelo arquivo (usado quando só os KPIs interessam)
+    """
+    cube = None
+    for bloco in stream_clean_chunks(file_path, chunk_rows=chunk_rows, usecols=CUBE_SOURCE_COLUMNS):
+        parcial = build_cube(bloco)
+        cube = parcial if cube is None else merge_cubes(cube, parcial)
+    return cube
+
+def _load_from_source(file_path, fingerprint=None):
+    """
+    Atualiza o cache colunar a partir do Excel e retorna (df, cubo)
+    """
+    if fingerprint is None:
+        fingerprint = file_fingerprint(file_path)
+    
+    # Reaproveita o cache colunar quando o Excel não mudou
+    with measure('load_data.sidecar') as m:
+        cached_df, dados = _read_sidecar(file_path)
+        valido = cached_df is not None and dados['fonte'] == fingerprint
+        m['cache'] = 'hit' if valido else 'miss'
+    if valido:
+        return cached_df, _cube_from_json(dados['cubo'])
+    
+    if not INCREMENTAL_INGEST:
+        df = clean_data(pd.read_excel(file_path))
+        cube = build_cube(df)
+        _write_sidecar(df, file_path, fingerprint, cube)
+        return df, cube
+    
+    # Processa só as linhas novas; se o início da planilha mudou, reconstrói tudo
+    lidas = None
+    if cached_df is not None and dados.get('watermark'):
+        with measure('load_data.excel_incremental'):
+            lidas = _read_sheet(file_path, dados['watermark'])
+    
+    if lidas is not None:
+        novos, watermark = lidas
+        with measure('load_data.incremental', linhas=len(novos)):
+            df = concat_clean([cached_df, novos])
+            cube = merge_cubes(_cube_from_json(dados['cubo']), build_cube(novos))
+    else:
+        with measure('load_data.excel') as m:
+            df, watermark = _read_sheet(file_path)
+            m['linhas'] = len(df)
+        with measure('load_data.cubo', linhas=len(df)):
+            cube = build_cube(df)
+    
+    if not df.empty:
+        watermark['ultima_data'] = df['DATA_ABORDAGEM'].max().isoformat()
+    with measure('load_data.gravar_sidecar', linhas=len(df)):
+        _write_sidecar(df, file_path, fingerprint, cube, watermark)
+    return df, cube
+
+# SNAPSHOT ARROW MAPEADO EM MEMÓRIA, COMPARTILHADO ENTRE PROCESSOS
+SNAPSHOT_SUFFIX = '.snapshot.arrow'
+
+def _snapshot_path(file_path):
+    return f"{file_path}{SNAPSHOT_SUFFIX}"
+
+def _write_snapshot(df, file_path, fingerprint):
+    """
+    Grava o DataFrame limpo em Arrow IPC sem compressão, para ser mapeado em memória
+    """
+    path = _snapshot_path(file_path)
+    tmp_path = None
+    try:
+        tmp_path = _temp_path(path)
+        table = pa.Table.from_pandas(df)
+        metadata = dict(table.schema.metadata or {})
+        metadata[SIDECAR_META_KEY] = json.dumps({'versao': SIDECAR_VERSION, 'fonte': fingerprint}).encode()
+        table = table.replace_schema_metadata(metadata)
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        # Processos que já mapearam o arquivo antigo continuam com a versão deles
+        os.replace(tmp_path, path)
+    except Exception:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def map_snapshot(file_path, fingerprint):
+    """
+    Mapeia o snapshot em memória sem copiá-lo; as páginas são compartilhadas entre processos
+    """
+    path = _snapshot_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        metadata = reader.schema.metadata or {}
+        esperado = {'versao': SIDECAR_VERSION, 'fonte': fingerprint}
+        if json.loads(metadata.get(SIDECAR_META_KEY, b'null')) != esperado:
+            return None
+        return reader.read_all()
+    except Exception:
+        return None
+
+def load_shared_table(file_path):
+    """
+    Retorna (tabela, fingerprint): os dados limpos como tabela Arrow mapeada do snapshot,
+    recriando-o se o Excel mudou
+    """
+    with measure('load_data.fingerprint'):
+        fingerprint = file_fingerprint(file_path)
+    with measure('load_data.snapshot') as m:
+        table = map_snapshot(file_path, fingerprint)
+        m['cache'] = 'miss' if table is None else 'hit'
+    if table is not None:
+        return table, fingerprint
+    
+    df, _ = _load_from_source(file_path, fingerprint)
+    with measure('load_data.gravar_snapshot', linhas=len(df)):
+        _write_snapshot(df, file_path, fingerprint)
+    table = map_snapshot(file_path, fingerprint)
+    # Sem snapshot gravado, usa uma tabela em memória comum
+    return (table if table is not None else pa.Table.from_pandas(df)), fingerprint
+
+# CARGA SEM STREAMLIT
+DEFAULT_FILE = "dashboard_rank.xlsx"
+
+def load_dataset(file_path=None):
+    """
+    Carrega os dados limpos (a partir do snapshot/cache colunar quando possível).
+    Lança a exceção original em caso de erro.
+    """
+    if file_path is None:
+        file_path = DEFAULT_FILE
+    
+    # Colunas numéricas e de data apontam direto para o snapshot mapeado
+    with measure('load_data.execucao', cache='miss') as m:
+        table, fingerprint = load_shared_table(file_path)
+        df = table.to_pandas(split_blocks=True)
+        df.attrs['fingerprint'] = fingerprint['sha256']
+        m['linhas'] = len(df)
+    return df
+
+def load_persisted_cube(file_path=None):
+    """
+    Lê o cubo de contagens persistido junto ao cache colunar, se ainda corresponder ao Excel
+    """
+    if file_path is None:
+        file_path = DEFAULT_FILE
+    
+    dados = _read_sidecar_metadata(file_path)
+    if dados is None or dados['fonte'] != file_fingerprint(file_path):
+        return None
+    cube = _cube_from_json(dados['cubo'])
+    cube.attrs['fingerprint'] = dados['fonte']['sha256']
+    return cube
+
+# CARGA DE VÁRIAS PLANILHAS E ABAS EM PARALELO
+# Colunas que identificam um lead entre abas e arquivos (separadas por vírgula). Sem chave (padrão),
+# nenhuma linha é descartada: na planilha original ID_LEAD é só um contador de linhas por aba.
+LEAD_KEY_COLUMNS = [col.strip() for col in os.environ.get('DASHBOARD_LEAD_KEY', '').split(',') if col.strip()]
+# Abaixo disso (soma dos arquivos), iniciar os processos custa mais do que ler tudo em um só
+PARALLEL_MIN_BYTES = 5 * 1024 * 1024
+
+def expand_sources(fontes, abas=None):
+    """
+    Lista as abas a ler como pares (arquivo, aba). `fontes` é um arquivo, um padrão glob ou uma lista deles;
+    'arquivo.xlsx#Aba' escolhe uma aba. Sem aba indicada, lê as abas de `abas` ou, se None, todas.
+    """
+    from openpyxl import load_workbook
+    
+    if isinstance(fontes, (str, os.PathLike)):
+        fontes = [fontes]
+    unidades = []
+    for fonte in fontes:
+        caminho, _, aba = str(fonte).partition('#')
+        arquivos = sorted(glob.glob(caminho, recursive=True)) if glob.has_magic(caminho) else [caminho]
+        for arquivo in arquivos:
+            if aba:
+                nomes = [aba]
+            else:
+                wb = load_workbook(arquivo, read_only=True)
+                try:
+                    nomes = [nome for nome in wb.sheetnames if abas is None or nome in abas]
+                finally:
+                    wb.close()
+            unidades.extend((arquivo, nome) for nome in nomes)
+    # Sem repetições, na ordem em que foram informadas
+    return list(dict.fromkeys(unidades))
+
+def deduplicate_leads(df, chave=None):
+    """
+    Mantém um registro por lead: o de DATA_ABORDAGEM mais recente; no empate, o lido por último.
+    Linhas com a chave vazia não são comparadas entre si e ficam todas.
+    Quantas linhas foram descartadas fica em attrs['leads_repetidos'].
+    """
+    chave = LEAD_KEY_COLUMNS if chave is None else list(chave)
+    if not chave or df.empty:
+        return df
+    faltando = [col for col in chave if col not in df.columns]
+    if faltando:
+        raise KeyError(f"Colunas da chave de lead ausentes: {faltando}")
+    
+    sem_chave = df[chave].isna().any(axis=1)
+    ordenado = df[~sem_chave].sort_values('DATA_ABORDAGEM', kind='stable')
+    unicos = ordenado[~ordenado.duplicated(subset=chave, keep='last')]
+    resultado = concat_clean([unicos, df[sem_chave]]).sort_index()
+    resultado.attrs['leads_repetidos'] = len(df) - len(resultado)
+    return resultado
+
+def read_source_sheet(file_path, aba, chave=None):
+    """
+    Lê e limpa uma aba (executado nos processos do pool), já sem os leads repetidos dentro dela.
+    Abas vazias retornam None.
+    """
+    try:
+        df = concat_clean(list(stream_clean_chunks(file_path, aba=aba)))
+    except ValueError as e:
+        if str(e) == "A planilha está vazia":
+            return None
+        raise ValueError(f"{file_path} [{aba}]: {e}") from e
+    except Exception as e:
+        raise ValueError(f"{file_path} [{aba}]: {type(e).__name__}: {e}") from e
+    return deduplicate_leads(df, chave)
+
+def load_sources(fontes, abas=None, chave=None, workers=None):
+    """
+    Lê várias planilhas/abas num pool de processos, com a limpeza e a classificação de sempre, e junta tudo.
+    Só com uma `chave` (ou DASHBOARD_LEAD_KEY) fica um registro por lead (ver deduplicate_leads).
+    Retorna o DataFrame limpo, como load_dataset; attrs['leads_repetidos'] diz quantas linhas foram descartadas.
+    """
+    chave = LEAD_KEY_COLUMNS if chave is None else list(chave)
+    with measure('load_sources.listar') as m:
+        unidades = expand_sources(fontes, abas)
+        m['abas'] = len(unidades)
+    if not unidades:
+        raise ValueError("Nenhuma planilha encontrada")
+    
+    # Cada processo lê, limpa e remove as repetições da sua aba; a junção final só vê o que sobrou
+    arquivos, nomes = zip(*unidades)
+    if workers is None and sum(os.path.getsize(arquivo) for arquivo in set(arquivos)) < PARALLEL_MIN_BYTES:
+        workers = 1
+    workers = min(workers or os.cpu_count() or 1, len(unidades))
+    with measure('load_sources.leitura', abas=len(unidades), processos=workers) as m:
+        if workers == 1:
+            frames = [read_source_sheet(arquivo, nome, chave) for arquivo, nome in unidades]
+        else:
+            # spawn: quem chama (ex.: o dashboard) pode ter threads, e fork com threads não é seguro
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                frames = list(pool.map(read_source_sheet, arquivos, nomes, [chave] * len(unidades)))
+        m['linhas'] = sum(len(f) for f in frames if f is not None)
+    if all(f is None for f in frames):
+        raise ValueError("As planilhas estão vazias")
+    
+    with measure('load_sources.juntar') as m:
+        repetidos = sum(f.attrs.get('leads_repetidos', 0) for f in frames if f is not None)
+        df = deduplicate_leads(concat_clean(frames).reset_index(drop=True), chave)
+        repetidos += df.attrs.get('leads_repetidos', 0)
+        m['linhas'] = len(df)
+        m['repetidos'] = repetidos
+    
+    # Versão do conjunto: conteúdo de cada arquivo, abas lidas e chave usada
+    sha = hashlib.sha256(json.dumps([unidades, chave]).encode())
+    for arquivo in dict.fromkeys(arquivos):
+        sha.update(file_fingerprint(arquivo)['sha256'].encode())
+    df.attrs['fingerprint'] = sha.hexdigest()
+    df.attrs['leads_repetidos'] = repetidos
+    return df
+
+# CORES MODERNAS - Nova paleta roxa
+CORES_MODERNAS = [
+    '#72559a',  # Roxo escuro
+    '#9177d1',  # Roxo médio
+    '#c5a2f2',  # Roxo claro
+    '#d5c5e3',  # Roxo muito claro
+    '#f6f2fa',  # Quase branco
+    '#e74c3c',  # Vermelho para contraste
+    '#3498db',  # Azul para contraste
+    '#2ecc71'   # Verde para contraste
+]
+
+# AGRUPAMENTO DAS CATEGORIAS MENORES NOS GRÁFICOS (TOP-N + OUTROS)
+# Com a fatia OUTROS, cada gráfico tem no máximo uma fatia por cor da paleta
+TOP_N_CATEGORIES = len(CORES_MODERNAS) - 1
+OUTROS_LABEL = 'OUTROS'
+CANAL_CONTAGENS = ['total_leads', 'com_retorno', 'sem_resposta', 'respostas_negativas', 'respostas_positivas']
+
+def top_n_with_others(tabela, rotulo, ordem, contagens, n=TOP_N_CATEGORIES):
+    """
+    Mantém as `n` linhas com maior `ordem` e soma as demais numa linha "OUTROS (k)",
+    com os totais exatos das colunas `contagens`
+    """
+    # Juntar uma única categoria em OUTROS não reduz nada
+    if len(tabela) <= n + 1:
+        return tabela.reset_index(drop=True)
+    ordenada = tabela.sort_values(ordem, ascending=False, kind='stable')
+    principais, resto = ordenada.iloc[:n], ordenada.iloc[n:]
+    outros = pd.DataFrame([{rotulo: f"{OUTROS_LABEL} ({len(resto)})", **resto[contagens].sum().to_dict()}])
+    return pd.concat([principais[[rotulo, *contagens]], outros], ignore_index=True)
+
+def _add_top_n(kpis, n=TOP_N_CATEGORIES):
+    """
+    Versões resumidas das tabelas por canal e por segmento, usadas pelos gráficos;
+    as tabelas completas continuam nos KPIs para o detalhamento
+    """
+    canais = kpis['canal_performance']
+    if not canais.empty:
+        top = top_n_with_others(canais, 'CANAL', 'total_leads', CANAL_CONTAGENS, n)
+        # Taxas da fatia OUTROS recalculadas a partir das contagens somadas
+        top['taxa_retorno'] = (top['com_retorno'] / top['total_leads'] * 100).round(1)
+        top['taxa_positiva'] = (top['respostas_positivas'] / top['total_leads'] * 100).round(1)
+        kpis['canal_performance_top'] = top
+    else:
+        kpis['canal_performance_top'] = pd.DataFrame()
+    
+    segmentos = kpis['sem_resposta_por_segmento']
+    if not segmentos.empty:
+        kpis['sem_resposta_por_segmento_top'] = top_n_with_others(segmentos, 'SEGMENTO', 'quantidade', ['quantidade'], n)
+    else:
+        kpis['sem_resposta_por_segmento_top'] = pd.DataFrame()
+    return kpis
+
+def _daily_kpis(leads_por_dia):
+    """
+    Leads do dia mais recente e evolução diária, a partir da contagem indexada por DIA
+    """
+    # LEADS DO DIA MAIS RECENTE
+    if leads_por_dia.empty:
+        return 0, pd.DataFrame()
+    leads_dia = int(leads_por_dia.iloc[-1])
+    
+    # CORREÇÃO: EVOLUÇÃO DIÁRIA em vez de mensal
+    leads_por_dia = leads_por_dia.reset_index(name='leads')
+    leads_por_dia['dia_formatado'] = leads_por_dia['DIA'].dt.strftime('%d/%m')
+    return leads_dia, leads_por_dia
+
+def _channel_performance(tabela):
+    """
+    Indicadores por canal a partir da tabela CANAL x RESULTADO (contagens)
+    """
+    canal_stats = pd.DataFrame({
+        'total_leads': tabela.sum(axis=1),
+        'sem_resposta': tabela.reindex(columns=SEM_RESPOSTA, fill_value=0).sum(axis=1),
+        'respostas_negativas': tabela.reindex(columns=['NEGATIVO'], fill_value=0).sum(axis=1),
+        'respostas_positivas': tabela.reindex(columns=RESPOSTAS_POSITIVAS, fill_value=0).sum(axis=1)
+    }).reset_index()
+    canal_stats['com_retorno'] = canal_stats['total_leads'] - canal_stats['sem_resposta']
+    
+    # Calcular taxas
+    canal_stats['taxa_retorno'] = (canal_stats['com_retorno'] / canal_stats['total_leads'] * 100).round(1)
+    canal_stats['taxa_positiva'] = (canal_stats['respostas_positivas'] / canal_stats['total_leads'] * 100).round(1)
+    
+    return canal_stats[[
+        'CANAL', 'total_leads', 'com_retorno', 'sem_resposta',
+        'respostas_negativas', 'respostas_positivas', 'taxa_retorno', 'taxa_positiva'
+    ]]
+
+def lttb_downsample(x, y, pontos):
+    """
+    Índices dos `pontos` mantidos pelo Largest-Triangle-Three-Buckets: reduz a série
+    preservando picos e vales (o primeiro e o último ponto sempre ficam)
+    """
+    n = len(y)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    
+    # pontos - 2 baldes entre o primeiro e o último ponto
+    bordas = np.linspace(1, n - 1, pontos - 1).astype('int64')
+    indices = np.empty(pontos, dtype='int64')
+    indices[0] = 0
+    anterior = 0
+    for i in range(pontos - 2):
+        inicio, fim = bordas[i], bordas[i + 1]
+        # O terceiro vértice é a média do balde seguinte (no último balde, o ponto final)
+        if i + 2 < len(bordas):
+            media_x = x[fim:bordas[i + 2]].mean()
+            media_y = y[fim:bordas[i + 2]].mean()
+        else:
+            media_x, media_y = x[-1], y[-1]
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    indices[-1] = n - 1
+    return indices
+
+# JANELAS MÓVEIS (7/30/90 DIAS) POR SOMAS ACUMULADAS
+ROLLING_WINDOWS = [7, 30, 90]
+ROLLING_COLUMNS = ['leads', 'com_retorno', 'respostas_positivas']
+
+def daily_channel_counts(cube):
+    """
+    Leads, retornos e respostas positivas por DIA x CANAL, a partir do cubo
+    (mesma classificação de TEVE_RETORNO e RESPOSTA_POSITIVA). Leads sem canal ficam com CANAL vazio.
+    """
+    resultado = cube.index.get_level_values('RESULTADO')
+    tabela = pd.DataFrame({
+        'leads': cube,
+        'com_retorno': cube.where(~resultado.isin(SEM_RESPOSTA), 0),
+        'respostas_positivas': cube.where(resultado.isin(RESPOSTAS_POSITIVAS), 0)
+    })
+    return tabela.groupby(level=['DIA', 'CANAL'], dropna=False).sum()
+
+class RollingCounts:
+    """
+    Somas acumuladas por dia corrido x canal: o total de qualquer janela é a diferença de duas linhas.
+    Leads sem canal ficam fora da abertura por canal, mas entram no total geral de cada dia.
+    """
+    def __init__(self, diario):
+        if diario.empty:
+            self.dias = pd.DatetimeIndex([])
+            self.canais = pd.Index([])
+            self.acumulado = np.zeros((1, 0, len(ROLLING_COLUMNS)), dtype='int64')
+            self.acumulado_geral = np.zeros((1, len(ROLLING_COLUMNS)), dtype='int64')
+            return
+        
+        # Dias sem leads entram com zero, para que a janela seja de dias corridos
+        datas = diario.index.get_level_values('DIA')
+        self.dias = pd.date_range(datas.min(), datas.max(), freq='D')
+        canal = diario.index.get_level_values('CANAL')
+        self.canais = pd.Index(sorted(canal.dropna().unique()))
+        por_canal = diario[canal.notna()].unstack('CANAL', fill_value=0).reindex(self.dias, fill_value=0)
+        matriz = np.stack([
+            por_canal[coluna].reindex(columns=self.canais, fill_value=0).to_numpy(dtype='int64')
+            if coluna in por_canal.columns.get_level_values(0) else np.zeros((len(self.dias), len(self.canais)), dtype='int64')
+            for coluna in ROLLING_COLUMNS
+        ], axis=-1)
+        self.acumulado = np.concatenate([np.zeros((1, *matriz.shape[1:]), dtype='int64'), matriz.cumsum(axis=0)])
+        geral = diario[ROLLING_COLUMNS].groupby(level='DIA').sum().reindex(self.dias, fill_value=0).to_numpy(dtype='int64')
+        self.acumulado_geral = np.concatenate([np.zeros((1, len(ROLLING_COLUMNS)), dtype='int64'), geral.cumsum(axis=0)])
+    
+    def _ultimo(self, fim):
+        return len(self.dias) if fim is None else int(np.searchsorted(self.dias, pd.Timestamp(fim).normalize(), 'right'))
+    
+    def totals(self, dias, fim=None):
+        """
+        Contagens por canal (canais x ROLLING_COLUMNS) nos `dias` dias que terminam em `fim` (padrão: último dia)
+        """
+        ultimo = self._ultimo(fim)
+        return self.acumulado[ultimo] - self.acumulado[max(0, ultimo - dias)]
+    
+    def overall(self, dias, fim=None):
+        """
+        Contagens de todos os leads (ROLLING_COLUMNS), inclusive os sem canal, na mesma janela de totals
+        """
+        ultimo = self._ultimo(fim)
+        return self.acumulado_geral[ultimo] - self.acumulado_geral[max(0, ultimo - dias)]
+    
+    def moving_average(self, dias):
+        """
+        Média diária de leads nos últimos `dias` dias, para cada dia (no início, sobre os dias disponíveis)
+        """
+        total = self.acumulado_geral[:, 0]
+        fim = np.arange(1, len(self.dias) + 1)
+        inicio = np.maximum(0, fim - dias)
+        return (total[fim] - total[inicio]) / (fim - inicio)
+
+def _rates(tabela):
+    tabela['taxa_retorno'] = (tabela['com_retorno'] / tabela['leads'].where(tabela['leads'] > 0) * 100).round(1).fillna(0)
+    tabela['taxa_positiva'] = (tabela['respostas_positivas'] / tabela['leads'].where(tabela['leads'] > 0) * 100).round(1).fillna(0)
+    return tabela
+
+def _rolling_kpis(kpis, rolling):
+    """
+    Totais e taxas das janelas móveis (geral e por canal) e médias móveis diárias de leads
+    """
+    if not len(rolling.dias):
+        kpis['janelas_moveis'] = pd.DataFrame()
+        kpis['janelas_moveis_por_canal'] = pd.DataFrame()
+        kpis['media_movel_diaria'] = pd.DataFrame()
+        return kpis
+    
+    gerais, por_canal = [], []
+    for janela in ROLLING_WINDOWS:
+        soma = rolling.totals(janela)
+        por_canal.append(pd.DataFrame(soma, columns=ROLLING_COLUMNS).assign(janela=janela, CANAL=list(rolling.canais)))
+        gerais.append({'janela': janela, **dict(zip(ROLLING_COLUMNS, rolling.overall(janela).tolist()))})
+    
+    kpis['janelas_moveis'] = _rates(pd.DataFrame(gerais))
+    kpis['janelas_moveis_por_canal'] = _rates(pd.concat(por_canal, ignore_index=True))[
+        ['janela', 'CANAL', *ROLLING_COLUMNS, 'taxa_retorno', 'taxa_positiva']
+    ]
+    kpis['media_movel_diaria'] = pd.DataFrame({
+        'DIA': rolling.dias,
+        **{f'media_{janela}d': rolling.moving_average(janela).round(2) for janela in ROLLING_WINDOWS}
+    })
+    return kpis
+
+# FUNÇÃO PARA CALCULAR KPIS
+def calculate_kpis(df, cube=None):
+    """
+    Calcula todos os KPIs necessários a partir do cubo de contagens
+    """
+    # O cubo persistido só vale se veio da mesma versão do Excel que o DataFrame recebido
+    with measure('calculate_kpis.cubo', linhas=len(df)) as m:
+        fonte = df.attrs.get('fingerprint')
+        valido = cube is not None and fonte is not None and cube.attrs.get('fingerprint') == fonte
+        m['cache'] = 'hit' if valido else 'miss'
+        if not valido:
+            cube = build_cube(df)
+    
+    return kpis_from_cube(cube)
+
+def kpis_from_cube(cube):
+    """
+    Calcula os KPIs a partir de um cubo de contagens (completo ou já recortado por filtros)
+    """
+    kpis = {}
+    dimensoes = cube.index.names
+    
+    with measure('calculate_kpis.leads_por_dia', linhas=len(cube)):
+        kpis['leads_dia'], kpis['leads_por_dia'] = _daily_kpis(cube.groupby(level='DIA').sum())
+    
+    # CORREÇÃO DEFINITIVA: Análise de canais simplificada e robusta
+    with measure('calculate_kpis.canal_performance', linhas=len(cube)):
+        if not cube.empty and 'CANAL' in dimensoes and 'RESULTADO' in dimensoes:
+            # Tabela CANAL x RESULTADO a partir do cubo (RESULTADO vazio conta no total do canal)
+            tabela = cube.groupby(level=['CANAL', 'RESULTADO'], dropna=False).sum().unstack(fill_value=0)
+            tabela = tabela[tabela.index.notna()]
+            kpis['canal_performance'] = _channel_performance(tabela)
+        else:
+            kpis['canal_performance'] = pd.DataFrame()
+    
+    # ANÁLISE DE SEGMENTOS SEM RESPOSTA
+    with measure('calculate_kpis.sem_resposta_por_segmento', linhas=len(cube)):
+        if 'SEGMENTO' in dimensoes and 'RESULTADO' in dimensoes:
+            sem_resposta = slice_cube(cube, RESULTADO=SEM_RESPOSTA)
+            if not sem_resposta.empty:
+                kpis['sem_resposta_por_segmento'] = sem_resposta.groupby(level='SEGMENTO').sum().reset_index(name='quantidade')
+            else:
+                kpis['sem_resposta_por_segmento'] = pd.DataFrame()
+        else:
+            kpis['sem_resposta_por_segmento'] = pd.DataFrame()
+    
+    # ESTATÍSTICAS GERAIS
+    with measure('calculate_kpis.estatisticas_gerais', linhas=len(cube)):
+        total_leads = int(cube.sum())
+        kpis['total_leads'] = total_leads
+        if 'RESULTADO' in dimensoes:
+            leads_sem_resposta = int(slice_cube(cube, RESULTADO=SEM_RESPOSTA).sum())
+            kpis['total_sem_resposta'] = leads_sem_resposta
+            kpis['percentual_sem_resposta'] = round(leads_sem_resposta / total_leads * 100, 1) if total_leads > 0 else 0
+        else:
+            kpis['total_sem_resposta'] = 0
+            kpis['percentual_sem_resposta'] = 0
+    
+    _add_top_n(kpis)
+    
+    # JANELAS MÓVEIS DE 7/30/90 DIAS
+    with measure('calculate_kpis.janelas_moveis', linhas=len(cube)):
+        if not cube.empty and 'CANAL' in dimensoes and 'RESULTADO' in dimensoes:
+            rolling = RollingCounts(daily_channel_counts(cube))
+        else:
+            rolling = RollingCounts(pd.DataFrame())
+        _rolling_kpis(kpis, rolling)
+    
+    kpis['cores_modernas'] = list(CORES_MODERNAS)
+    
+    return kpis
+
+# ÍNDICE DE FILTROS SOBRE O CUBO
+class FilterIndex:
+    """
+    Cubo ordenado por DIA com os códigos de canal e segmento em arrays: uma janela de datas
+    vira uma busca binária e os filtros de canal/segmento, uma máscara sobre as células da janela
+    """
+    def __init__(self, cube):
+        self.cube = cube.sort_index()
+        indice = self.cube.index
+        self.dias = indice.get_level_values('DIA').to_numpy()
+        self.canais = pd.Index(sorted(indice.get_level_values('CANAL').dropna().unique()))
+        self.segmentos = pd.Index(sorted(indice.get_level_values('SEGMENTO').dropna().unique()))
+        self._canal_codes = self.canais.get_indexer(indice.get_level_values('CANAL'))
+        self._segmento_codes = self.segmentos.get_indexer(indice.get_level_values('SEGMENTO'))
+    
+    def options(self):
+        """
+        Valores disponíveis para os filtros
+        """
+        return {
+            'inicio': pd.Timestamp(self.dias[0]).date() if len(self.dias) else None,
+            'fim': pd.Timestamp(self.dias[-1]).date() if len(self.dias) else None,
+            'canais': list(self.canais),
+            'segmentos': list(self.segmentos)
+        }
+    
+    def slice(self, inicio=None, fim=None, canais=None, segmentos=None):
+        """
+        Recorta o cubo pelos filtros (datas inclusivas; None = sem filtro)
+        """
+        primeiro = 0 if inicio is None else np.searchsorted(self.dias, np.datetime64(pd.Timestamp(inicio).normalize()), 'left')
+        ultimo = len(self.dias) if fim is None else np.searchsorted(self.dias, np.datetime64(pd.Timestamp(fim).normalize()), 'right')
+        janela = slice(primeiro, ultimo)
+        mascara = np.ones(ultimo - primeiro if ultimo > primeiro else 0, dtype=bool)
+        if canais is not None:
+            mascara &= np.isin(self._canal_codes[janela], self.canais.get_indexer(list(canais)))
+        if segmentos is not None:
+            mascara &= np.isin(self._segmento_codes[janela], self.segmentos.get_indexer(list(segmentos)))
+        return self.cube.iloc[janela][mascara]
+    
+    def calculate_kpis(self, **filtros):
+        with measure('filter_index.slice', filtros=filtros) as m:
+            recorte = self.slice(**filtros)
+            m['celulas'] = len(recorte)
+        return kpis_from_cube(recorte)
+
+# ARMAZENAMENTO EMBUTIDO (SQLITE) COM CONSULTAS AGREGADAS
+# 'sqlite' guarda os leads limpos num banco ao lado do Excel e calcula os KPIs por consultas;
+# vazio mantém os dados em memória (DataFrame)
+STORE_BACKEND = os.environ.get('DASHBOARD_STORE', '')
+STORE_SUFFIX = '.store.sqlite'
+
+def _store_path(file_path):
+    return f"{file_path}{STORE_SUFFIX}"
+
+class LeadStore:
+    """
+    Leads limpos num banco SQLite somente leitura, com índices em data, canal e segmento.
+    Os KPIs são calculados no banco; só os agregados chegam ao pandas.
+    """
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._linhas = None
+    
+    def _connect(self):
+        # Uma conexão por consulta: o objeto é compartilhado entre threads e processos
+        return sqlite3.connect(f"{Path(self.path).absolute().as_uri()}?mode=ro", uri=True)
+    
+    def query(self, sql, params=()):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+    
+    def __len__(self):
+        if self._linhas is None:
+            self._linhas = int(self.query("SELECT COUNT(*) AS n FROM leads")['n'].iloc[0])
+        return self._linhas
+    
+    @staticmethod
+    def _where(inicio=None, fim=None, canais=None, segmentos=None):
+        """
+        Cláusula WHERE e parâmetros para os filtros (datas inclusivas)
+        """
+        condicoes, params = [], []
+        if inicio is not None:
+            condicoes.append("DATA_ABORDAGEM >= ?")
+            params.append(pd.Timestamp(inicio).strftime('%Y-%m-%d'))
+        if fim is not None:
+            condicoes.append("DATA_ABORDAGEM < ?")
+            params.append((pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+        for coluna, valores in (('CANAL', canais), ('SEGMENTO', segmentos)):
+            if valores is not None:
+                valores = list(valores)
+                condicoes.append(f"{coluna} IN ({', '.join('?' * len(valores))})" if valores else "0")
+                params.extend(valores)
+        return (' WHERE ' + ' AND '.join(condicoes)) if condicoes else '', params
+    
+    def options(self):
+        """
+        Valores disponíveis para os filtros, lidos dos índices
+        """
+        datas = self.query("SELECT substr(MIN(DATA_ABORDAGEM), 1, 10) AS inicio, substr(MAX(DATA_ABORDAGEM), 1, 10) AS fim FROM leads").iloc[0]
+        return {
+            'inicio': pd.Timestamp(datas['inicio']).date() if datas['inicio'] else None,
+            'fim': pd.Timestamp(datas['fim']).date() if datas['fim'] else None,
+            'canais': self.query("SELECT DISTINCT CANAL FROM leads WHERE CANAL IS NOT NULL ORDER BY CANAL")['CANAL'].tolist(),
+            'segmentos': self.query("SELECT DISTINCT SEGMENTO FROM leads WHERE SEGMENTO IS NOT NULL ORDER BY SEGMENTO")['SEGMENTO'].tolist()
+        }
+    
+    def daily_channel_counts(self, inicio=None, fim=None, canais=None, segmentos=None):
+        """
+        Mesma tabela de daily_channel_counts (leads, retornos e positivas por DIA x CANAL, CANAL vazio
+        para os leads sem canal), agregada no banco
+        """
+        where, params = self._where(inicio, fim, canais, segmentos)
+        sem_resposta = ', '.join('?' * len(SEM_RESPOSTA))
+        positivas = ', '.join('?' * len(RESPOSTAS_POSITIVAS))
+        diario = self.query(
+            f"SELECT substr(DATA_ABORDAGEM, 1, 10) AS DIA, CANAL, COUNT(*) AS leads, "
+            f"SUM(COALESCE(RESULTADO NOT IN ({sem_resposta}), 1)) AS com_retorno, "
+            f"COALESCE(SUM(RESULTADO IN ({positivas})), 0) AS respostas_positivas "
+            f"FROM leads{where} GROUP BY 1, 2",
+            SEM_RESPOSTA + RESPOSTAS_POSITIVAS + params
+        )
+        diario['DIA'] = pd.to_datetime(diario['DIA'])
+        return diario.set_index(['DIA', 'CANAL'])
+    
+    def calculate_kpis(self, inicio=None, fim=None, canais=None, segmentos=None):
+        """
+        Mesmos KPIs de calculate_kpis, com cada agregação feita no banco
+        """
+        kpis = {}
+        where, params = self._where(inicio, fim, canais, segmentos)
+        e_filtro = where.replace(' WHERE ', ' AND ', 1)
+        
+        with measure('store_kpis.leads_por_dia'):
+            diario = self.query(
+                f"SELECT substr(DATA_ABORDAGEM, 1, 10) AS DIA, COUNT(*) AS leads FROM leads{where} GROUP BY 1 ORDER BY 1",
+                params
+            )
+            diario['DIA'] = pd.to_datetime(diario['DIA']).astype('datetime64[ns]')
+            _, kpis['leads_por_dia'] = _daily_kpis(diario.set_index('DIA')['leads'].rename(None))
+        
+        # Contagem do último dia pelo índice de DATA_ABORDAGEM, sem varrer a tabela
+        with measure('store_kpis.leads_dia'):
+            kpis['leads_dia'] = int(self.query(
+                f"SELECT COUNT(*) AS n FROM leads WHERE DATA_ABORDAGEM >= "
+                f"(SELECT substr(MAX(DATA_ABORDAGEM), 1, 10) FROM leads{where}){e_filtro}",
+                params + params
+            )['n'].iloc[0])
+        
+        with measure('store_kpis.canal_performance'):
+            tabela = self.query(
+                f"SELECT CANAL, COALESCE(RESULTADO, '') AS RESULTADO, COUNT(*) AS n FROM leads "
+                f"WHERE CANAL IS NOT NULL{e_filtro} GROUP BY CANAL, RESULTADO",
+                params
+            )
+            if not tabela.empty:
+                tabela = tabela.pivot_table(index='CANAL', columns='RESULTADO', values='n', aggfunc='sum', fill_value=0).astype('int64')
+                kpis['canal_performance'] = _channel_performance(tabela)
+            else:
+                kpis['canal_performance'] = pd.DataFrame()
+        
+        with measure('store_kpis.sem_resposta_por_segmento'):
+            marcadores = ', '.join('?' * len(SEM_RESPOSTA))
+            sem_resposta = self.query(
+                f"SELECT SEGMENTO, COUNT(*) AS quantidade FROM leads "
+                f"WHERE RESULTADO IN ({marcadores}) AND SEGMENTO IS NOT NULL{e_filtro} GROUP BY SEGMENTO ORDER BY SEGMENTO",
+                SEM_RESPOSTA + params
+            )
+            kpis['sem_resposta_por_segmento'] = sem_resposta if not sem_resposta.empty else pd.DataFrame()
+        
+        with measure('store_kpis.estatisticas_gerais'):
+            totais = self.query(
+                f"SELECT COUNT(*) AS total, COALESCE(SUM(RESULTADO IN ({marcadores})), 0) AS sem_resposta FROM leads{where}",
+                SEM_RESPOSTA + params
+            ).iloc[0]
+            total_leads = int(totais['total'])
+            kpis['total_leads'] = total_leads
+            kpis['total_sem_resposta'] = int(totais['sem_resposta'])
+            kpis['percentual_sem_resposta'] = round(kpis['total_sem_resposta'] / total_leads * 100, 1) if total_leads > 0 else 0
+        
+        _add_top_n(kpis)
+        
+        with measure('store_kpis.janelas_moveis'):
+            _rolling_kpis(kpis, RollingCounts(self.daily_channel_counts(inicio, fim, canais, segmentos)))
+        
+        kpis['cores_modernas'] = list(CORES_MODERNAS)
+        return kpis
+
+def _build_store(file_path, fingerprint):
+    """
+    Carrega o Excel em blocos para o banco e cria os índices no final (mais rápido que indexar a cada inserção)
+    """
+    path = _store_path(file_path)
+    tmp_path = _temp_path(path)
+    try:
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            conn.execute("CREATE TABLE leads (DATA_ABORDAGEM TEXT NOT NULL, CANAL TEXT, SEGMENTO TEXT, RESULTADO TEXT)")
+            conn.execute("CREATE TABLE metadados (chave TEXT PRIMARY KEY, valor TEXT)")
+            for bloco in stream_clean_chunks(file_path, usecols=CUBE_SOURCE_COLUMNS):
+                linhas = pd.DataFrame({
+                    'DATA_ABORDAGEM': bloco['DATA_ABORDAGEM'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+                    **{col: bloco[col].astype(str) if col in bloco.columns else None for col in ['CANAL', 'SEGMENTO', 'RESULTADO']}
+                })
+                conn.executemany("INSERT INTO leads VALUES (?, ?, ?, ?)", linhas.itertuples(index=False, name=None))
+            conn.execute("CREATE INDEX idx_leads_data ON leads (DATA_ABORDAGEM)")
+            conn.execute("CREATE INDEX idx_leads_canal ON leads (CANAL)")
+            conn.execute("CREATE INDEX idx_leads_segmento ON leads (SEGMENTO)")
+            conn.execute(
+                "INSERT INTO metadados VALUES ('fonte', ?)",
+                (json.dumps({'versao': SIDECAR_VERSION, 'fonte': fingerprint}),)
+            )
+            conn.commit()
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _store_is_current(path, fingerprint):
+    if not os.path.exists(path):
+        return False
+    try:
+        with closing(sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True)) as conn:
+            valor = conn.execute("SELECT valor FROM metadados WHERE chave = 'fonte'").fetchone()
+        return valor is not None and json.loads(valor[0]) == {'versao': SIDECAR_VERSION, 'fonte': fingerprint}
+    except sqlite3.Error:
+        # Banco corrompido ou de outra versão: reconstrói
+        return False
+
+def open_store(file_path=None):
+    """
+    Abre o banco de leads do Excel, reconstruindo-o se o Excel mudou
+    """
+    if file_path is None:
+        file_path = DEFAULT_FILE
+    
+    with measure('load_store.fingerprint'):
+        fingerprint = file_fingerprint(file_path)
+    path = _store_path(file_path)
+    with measure('load_store.banco') as m:
+        atual = _store_is_current(path, fingerprint)
+        m['cache'] = 'hit' if atual else 'miss'
+        if not atual:
+            _build_store(file_path, fingerprint)
+    return LeadStore(path, fingerprint['sha256'])
+
+# CACHE DE RESULTADOS POR VERSÃO DOS DADOS
+RESULT_CACHE_TTL = 600  # segundos; 0 desativa a expiração
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+def _estimate_size(valor):
+    """
+    Estimativa do espaço ocupado por um resultado em cache, em bytes
+    """
+    if isinstance(valor, (str, bytes)):
+        return len(valor)
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, dict):
+        return sum(_estimate_size(k) + _estimate_size(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sum(_estimate_size(v) for v in valor)
+    return sys.getsizeof(valor)
+
+class ResultCache:
+    """
+    Cache LRU com validade (TTL) e limite de memória, compartilhado entre as sessões
+    """
+    def __init__(self, ttl_seconds=RESULT_CACHE_TTL, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and self.ttl_seconds and time.monotonic() - item[2] > self.ttl_seconds:
+                self._remove(chave)
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return item[0]
+    
+    def put(self, chave, valor):
+        tamanho = _estimate_size(valor)
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            if chave in self._itens:
+                self._remove(chave)
+            self._itens[chave] = (valor, tamanho, time.monotonic())
+            self._bytes += tamanho
+            # Remove os itens usados há mais tempo até caber no limite
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._itens)))
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._itens),
+                'bytes': self._bytes
+            }
+    
+    def _remove(self, chave):
+        _, tamanho, _ = self._itens.pop(chave)
+        self._bytes -= tamanho
+
+_result_cache = ResultCache()
+
+def get_result_cache():
+    """
+    Instância única do cache de resultados por processo
+    """
+    return _result_cache
+
+def dataset_fingerprint(df):
+    """
+    Identificador da versão dos dados, usado como chave dos caches de resultados.
+    Recortes do DataFrame herdam o identificador: os filtros aplicados precisam entrar na chave.
+    """
+    if isinstance(df, LeadStore):
+        return df.fingerprint
+    fingerprint = df.attrs.get('fingerprint')
+    if fingerprint is None:
+        fingerprint = hashlib.sha256(pd.util.hash_pandas_object(df).to_numpy().tobytes()).hexdigest()
+    return fingerprint
+
+def result_key(tipo, df, filtros=None):
+    """
+    Chave de cache: tipo do resultado, versão dos dados e filtros aplicados
+    """
+    return (tipo, dataset_fingerprint(df), json.dumps(filtros or {}, sort_keys=True, default=str))
+
+# SERIALIZAÇÃO DOS KPIS
+def serialize_kpis(kpis):
+    """
+    Converte o dicionário de KPIs em estruturas JSON (tabelas viram listas de registros)
+    """
+    saida = {}
+    for nome, valor in kpis.items():
+        if nome == 'cores_modernas':
+            continue
+        if isinstance(valor, pd.DataFrame):
+            tabela = valor.copy()
+            for col in tabela.columns:
+                if pd.api.types.is_datetime64_any_dtype(tabela[col]):
+                    tabela[col] = tabela[col].dt.strftime('%Y-%m-%d')
+            saida[nome] = json.loads(tabela.to_json(orient='records', force_ascii=False))
+        elif isinstance(valor, (np.integer, np.floating)):
+            saida[nome] = valor.item()
+        else:
+            saida[nome] = valor
+    return saida
+
+TABELAS_KPIS = [
+    'leads_por_dia', 'canal_performance', 'sem_resposta_por_segmento',
+    'canal_performance_top', 'sem_resposta_por_segmento_top',
+    'janelas_moveis', 'janelas_moveis_por_canal', 'media_movel_diaria'
+]
+
+def deserialize_kpis(dados):
+    """
+    Reconstrói o dicionário de KPIs gerado por serialize_kpis
+    """
+    kpis = dict(dados)
+    for nome in TABELAS_KPIS:
+        tabela = pd.DataFrame(dados.get(nome) or [])
+        if 'DIA' in tabela.columns:
+            tabela['DIA'] = pd.to_datetime(tabela['DIA'])
+        kpis[nome] = tabela
+    kpis['cores_modernas'] = list(CORES_MODERNAS)
+    return kpis
+
+# ÚLTIMO RESULTADO VÁLIDO (KPIS E GRÁFICOS) PERSISTIDO AO LADO DO EXCEL
+KPI_SNAPSHOT_SUFFIX = '.kpis.json'
+# Incrementar sempre que o formato dos KPIs ou dos gráficos salvos mudar
+KPI_SNAPSHOT_VERSION = 5
+
+def _kpi_snapshot_path(file_path):
+    return f"{file_path}{KPI_SNAPSHOT_SUFFIX}"
+
+def file_signature(file_path):
+    """
+    Verificação barata de mudança no arquivo (tamanho e data de modificação), sem ler o conteúdo
+    """
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def write_kpi_snapshot(file_path, snapshot):
+    """
+    Grava o snapshot de KPIs e gráficos já serializados, substituindo o anterior de forma atômica
+    """
+    path = _kpi_snapshot_path(file_path)
+    tmp_path = None
+    try:
+        tmp_path = _temp_path(path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({**snapshot, 'versao': KPI_SNAPSHOT_VERSION}, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+    except Exception:
+        # Sem o snapshot em disco, o próximo processo só começa mais devagar
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def read_kpi_snapshot(file_path):
+    """
+    Lê o último snapshot válido, mesmo que o Excel já tenha mudado (quem chama decide se atualiza)
+    """
+    path = _kpi_snapshot_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        return snapshot if snapshot.get('versao') == KPI_SNAPSHOT_VERSION else None
+    except Exception:
+        return None
+
+# OBSERVAÇÃO DO EXCEL: AVISA QUANDO O ARQUIVO MUDA
+WATCH_POLL_SECONDS = 2  # intervalo da verificação periódica (sem watchdog)
+WATCH_DEBOUNCE_SECONDS = 1  # o Excel grava em várias etapas: espera o arquivo assentar
+
+class _WatchHandler:
+    """
+    Repassa ao FileWatcher só os eventos do arquivo observado
+    """
+    def __init__(self, watcher):
+        self.watcher = watcher
+    
+    def dispatch(self, event):
+        if event.is_directory:
+            return
+        caminhos = {os.path.abspath(os.fsdecode(event.src_path))}
+        if getattr(event, 'dest_path', None):
+            caminhos.add(os.path.abspath(os.fsdecode(event.dest_path)))
+        if self.watcher.path in caminhos:
+            self.watcher._changed()
+
+class FileWatcher:
+    """
+    Chama `callback` quando o arquivo muda: por eventos do sistema (watchdog) ou,
+    na falta dele, comparando tamanho e data de modificação a cada `poll_seconds`
+    """
+    def __init__(self, file_path, callback, poll_seconds=WATCH_POLL_SECONDS, debounce_seconds=WATCH_DEBOUNCE_SECONDS):
+        self.path = os.path.abspath(file_path)
+        self.callback = callback
+        self.poll_seconds = poll_seconds
+        self.debounce_seconds = debounce_seconds
+        self.modo = None
+        self._observer = None
+        self._timer = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+    
+    def start(self):
+        if Observer is not None:
+            try:
+                observer = Observer()
+                observer.daemon = True
+                observer.schedule(_WatchHandler(self), os.path.dirname(self.path), recursive=False)
+                observer.start()
+                self._observer = observer
+                self.modo = 'eventos'
+                return self
+            except Exception:
+                # Limite de inotify atingido ou sistema de arquivos sem eventos (ex.: rede)
+                pass
+        threading.Thread(target=self._poll, name='dashboard-watch', daemon=True).start()
+        self.modo = 'verificacao_periodica'
+        return self
+    
+    def stop(self):
+        self._parar.set()
+        if self._observer is not None:
+            self._observer.stop()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+    
+    def _changed(self):
+        # Reinicia a espera a cada evento; o callback roda uma vez, depois do último
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce_seconds, self.callback)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def _poll(self):
+        def assinatura():
+            try:
+                return file_signature(self.path)
+            except OSError:
+                return None
+        
+        ultima = assinatura()
+        while not self._parar.wait(self.poll_seconds):
+            atual = assinatura()
+            if atual != ultima:
+                ultima = atual
+                self._changed()
@@ -0,0 +1,347 @@
+# Visões do Dashboard
+# Gráficos, cartões, insights e o snapshot da visão sem filtros, montados sem depender do Streamlit.
+# Usado pelo dashboard, pelo relatório estático e pelo benchmark.
+
+import hashlib
+import json
+from datetime import datetime
+
+from kpi_engine import (
+    STORE_BACKEND,
+    FilterIndex,
+    build_cube,
+    calculate_kpis,
+    daily_channel_counts,
+    file_fingerprint,
+    file_signature,
+    load_dataset,
+    load_persisted_cube,
+    lttb_downsample,
+    measure,
+    open_store,
+    serialize_kpis,
+)
+from lead_forecast import channel_series
+
+# ORÇAMENTO DE PAYLOAD DOS GRÁFICOS
+DAILY_MAX_POINTS = 500  # acima disso a série diária é reduzida por LTTB
+DAILY_MIN_POINTS = 60
+WEBGL_POINT_THRESHOLD = 1000  # dias no período (antes da redução) acima dos quais usa WebGL (Scattergl) em vez de SVG
+MARKERS_MAX_POINTS = 120  # marcador em cada dia só em séries curtas
+CHART_MAX_BYTES = 150 * 1024  # tamanho máximo do JSON de um gráfico
+
+# Médias móveis sobrepostas à evolução diária (janela em dias: cor e traço)
+ROLLING_OVERLAYS = {7: ('#e74c3c', 'dot'), 30: ('#3498db', 'dash'), 90: ('#2ecc71', 'longdash')}
+
+def daily_evolution_figure(leads_por_dia, max_pontos=DAILY_MAX_POINTS, media_movel=None):
+    """
+    Gráfico da evolução diária sobre um eixo de datas, com no máximo `max_pontos` pontos
+    por série, e as médias móveis de `media_movel` sobrepostas
+    """
+    # Plotly só é importado quando um gráfico é montado, não na inicialização
+    import plotly.graph_objects as go
+    
+    serie = leads_por_dia.sort_values('DIA')
+    dias_totais = len(serie)
+    indices = lttb_downsample(serie['DIA'].to_numpy().astype('datetime64[ns]').astype('int64'), serie['leads'].to_numpy(), max_pontos)
+    serie = serie.iloc[indices]
+    
+    # A decisão usa o tamanho do período, não a série já reduzida (que nunca passa de max_pontos)
+    trace = go.Scattergl if dias_totais > WEBGL_POINT_THRESHOLD else go.Scatter
+    fig_daily = go.Figure(trace(
+        x=serie['DIA'],
+        y=serie['leads'],
+        mode='lines+markers' if len(serie) <= MARKERS_MAX_POINTS else 'lines',
+        line=dict(color='#72559a', width=3),
+        marker=dict(color='#72559a', size=8, line=dict(color='white', width=2)),
+        hovertemplate='<b>Dia %{x|%d/%m/%Y}</b><br>Leads: %{y}<extra></extra>',
+        name='Leads por dia'
+    ))
+    
+    # MÉDIAS MÓVEIS: cada série é reduzida separadamente, com o mesmo limite de pontos
+    sobreposicoes = 0
+    if media_movel is not None and not media_movel.empty:
+        dias_corridos = media_movel['DIA'].to_numpy().astype('datetime64[ns]').astype('int64')
+        for janela, (cor, traco) in ROLLING_OVERLAYS.items():
+            coluna = f'media_{janela}d'
+            if coluna not in media_movel.columns:
+                continue
+            media = media_movel.iloc[lttb_downsample(dias_corridos, media_movel[coluna].to_numpy(), max_pontos)]
+            fig_daily.add_trace(trace(
+                x=media['DIA'],
+                y=media[coluna],
+                mode='lines',
+                line=dict(color=cor, width=2, dash=traco),
+                hovertemplate=f'<b>Dia %{{x|%d/%m/%Y}}</b><br>Média {janela} dias: %{{y:.1f}}<extra></extra>',
+                name=f'Média {janela} dias'
+            ))
+            sobreposicoes += 1
+    
+    # Dentro de um ano basta dia/mês; em históricos longos o Plotly escolhe o formato
+    um_ano = (serie['DIA'].iloc[-1] - serie['DIA'].iloc[0]).days <= 366
+    fig_daily.update_layout(
+        title='📈 Evolução Diária de Leads',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_family="Inter, -apple-system, BlinkMacSystemFont, sans-serif",
+        title_font_size=20,
+        title_font_color='#1f2937',
+        title_x=0.02,
+        xaxis_title="Dia",
+        yaxis_title="Quantidade de Leads",
+        showlegend=sobreposicoes > 0,
+        legend=dict(orientation="h", yanchor="bottom", y=1.0, xanchor="right", x=1, font=dict(size=11)),
+        margin=dict(l=40, r=40, t=60, b=40),
+        xaxis=dict(
+            type='date',
+            tickformat='%d/%m' if um_ano else None,
+            showgrid=False,
+            showline=False,
+            zeroline=False,
+            tickfont=dict(color='#6b7280', size=12),
+            tickangle=45
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(0,0,0,0.05)',
+            showline=False,
+            zeroline=False,
+            tickfont=dict(color='#6b7280', size=12)
+        ),
+        # Quantos dias foram exibidos, para o aviso de amostragem e o diagnóstico
+        meta={'pontos': len(serie), 'pontos_originais': dias_totais}
+    )
+    return fig_daily
+
+def slice_colors(cores, quantidade):
+    """
+    Uma cor para cada fatia, repetindo a paleta se houver mais fatias que cores
+    """
+    return [cores[i % len(cores)] for i in range(quantidade)]
+
+# FUNÇÃO PARA CRIAR GRÁFICOS
+def create_charts(kpis):
+    """
+    Cria todos os gráficos do dashboard
+    """
+    # Plotly só é importado quando um gráfico é montado, não na inicialização
+    import plotly.graph_objects as go
+    
+    charts = {}
+    
+    # GRÁFICO 1: Evolução DIÁRIA de leads (CORRIGIDO)
+    with measure('create_charts.daily_evolution') as m:
+        if not kpis['leads_por_dia'].empty:
+            # Eixo de datas real; séries longas são reduzidas até caber no orçamento de payload
+            pontos = DAILY_MAX_POINTS
+            while True:
+                fig_daily = daily_evolution_figure(kpis['leads_por_dia'], pontos, kpis.get('media_movel_diaria'))
+                tamanho = len(fig_daily.to_json())
+                if tamanho <= CHART_MAX_BYTES or pontos <= DAILY_MIN_POINTS:
+                    break
+                pontos = max(DAILY_MIN_POINTS, pontos // 2)
+            m.update(fig_daily.layout.meta, bytes=tamanho)
+            charts['daily_evolution'] = fig_daily
+    
+    # GRÁFICO 2: Lead's que me responderam (NOME ALTERADO)
+    with measure('create_charts.channel_performance'):
+        if not kpis['canal_performance'].empty:
+            # Maiores canais e a fatia OUTROS: o custo do gráfico não cresce com o número de canais
+            canais = kpis['canal_performance_top']
+            fig_channel = go.Figure(data=[go.Pie(
+                labels=canais['CANAL'],
+                values=canais['taxa_retorno'],
+                hole=0.8,
+                marker=dict(
+                    colors=slice_colors(kpis['cores_modernas'], len(canais)),
+                    line=dict(color='white', width=3)
+                ),
+                textinfo='label+percent',
+                textfont=dict(size=14, color='#72559a'),
+                hovertemplate='<b>%{label}</b><br>Taxa de Retorno: %{value}%<br>Total: %{customdata} leads<extra></extra>',
+                customdata=canais['total_leads']
+            )])
+            
+            fig_channel.update_layout(
+                title='📊 Lead\'s que me responderam',
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_family="Inter, -apple-system, BlinkMacSystemFont, sans-serif",
+                title_font_size=20,
+                title_font_color='#1f2937',
+                title_x=0.02,
+                showlegend=True,
+                legend=dict(
+                    orientation="v",
+                    yanchor="middle",
+                    y=0.5,
+                    xanchor="left",
+                    x=1.05,
+                    font=dict(size=12)
+                ),
+                margin=dict(l=40, r=120, t=60, b=40),
+                annotations=[dict(
+                    text=f"Taxa Média<br><b>{kpis['canal_performance']['taxa_retorno'].mean():.1f}%</b>",
+                    x=0.5, y=0.5,
+                    font_size=16,
+                    font_color='#72559a',
+                    showarrow=False
+                )]
+            )
+            charts['channel_performance'] = fig_channel
+    
+    # GRÁFICO 3: Lead que não responderam (NOME ALTERADO)
+    with measure('create_charts.segments_no_response'):
+        if not kpis['sem_resposta_por_segmento'].empty:
+            segmentos = kpis['sem_resposta_por_segmento_top']
+            fig_segments = go.Figure(data=[go.Pie(
+                labels=segmentos['SEGMENTO'],
+                values=segmentos['quantidade'],
+                hole=0.8,
+                marker=dict(
+                    colors=slice_colors(kpis['cores_modernas'], len(segmentos)),
+                    line=dict(color='white', width=3)
+                ),
+                textinfo='label+percent',
+                textfont=dict(size=14, color='#72559a'),
+                hovertemplate='<b>%{label}</b><br>Sem resposta: %{value}<extra></extra>'
+            )])
+            
+            fig_segments.update_layout(
+                title='🎯 Lead\'s que não responderam',
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_family="Inter, -apple-system, BlinkMacSystemFont, sans-serif",
+                title_font_size=20,
+                title_font_color='#1f2937',
+                title_x=0.02,
+                showlegend=True,
+                legend=dict(
+                    orientation="h",
+                    yanchor="top",
+                    y=-0.05,
+                    xanchor="center",
+                    x=0.5,
+                    font=dict(size=12)
+                ),
+                margin=dict(l=40, r=40, t=60, b=80),
+                annotations=[dict(
+                    text=f"Total<br><b>{kpis['sem_resposta_por_segmento']['quantidade'].sum()}</b>",
+                    x=0.5, y=0.5,
+                    font_size=16,
+                    font_color='#72559a',
+                    showarrow=False
+                )]
+            )
+            charts['segments_no_response'] = fig_segments
+    
+    return charts
+
+def serialize_charts(charts):
+    """
+    Serializa os gráficos para JSON, registrando o tamanho de cada um no diagnóstico
+    """
+    serializados = {}
+    for nome, fig in charts.items():
+        with measure(f'serialize_chart.{nome}') as m:
+            serializados[nome] = fig.to_json()
+            m['bytes'] = len(serializados[nome])
+    return serializados
+
+# SNAPSHOT DA VISÃO SEM FILTROS (gravado em disco, servido pela API e usado no relatório)
+def compute_snapshot(file_path, forecaster=None):
+    """
+    Recalcula KPIs, gráficos e opções de filtro da visão sem filtros, já no formato do snapshot.
+    As previsões por canal são pedidas ao `forecaster` e ficam prontas depois, em segundo plano.
+    """
+    assinatura = file_signature(file_path)
+    fonte = file_fingerprint(file_path)['sha256']
+    if STORE_BACKEND == 'sqlite':
+        store = open_store(file_path)
+        kpis = store.calculate_kpis()
+        opcoes = store.options()
+        diario = store.daily_channel_counts() if forecaster is not None else None
+    else:
+        df = load_dataset(file_path)
+        cube = load_persisted_cube(file_path)
+        if cube is None:
+            cube = build_cube(df)
+        kpis = calculate_kpis(df, cube)
+        opcoes = FilterIndex(cube).options()
+        diario = daily_channel_counts(cube) if forecaster is not None and not cube.empty else None
+    previsoes = forecaster.request(channel_series(diario)) if diario is not None else {}
+    return {
+        'fonte': fonte,
+        'assinatura': assinatura,
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'kpis': serialize_kpis(kpis),
+        'charts': {nome: json.loads(texto) for nome, texto in serialize_charts(create_charts(kpis)).items()},
+        'opcoes': opcoes,
+        'previsoes': previsoes
+    }
+
+def forecast_series(file_path):
+    """
+    Série diária de cada canal (todo o histórico), a mesma que compute_snapshot envia às previsões
+    """
+    if STORE_BACKEND == 'sqlite':
+        diario = open_store(file_path).daily_channel_counts()
+    else:
+        cube = load_persisted_cube(file_path)
+        if cube is None:
+            cube = build_cube(load_dataset(file_path))
+        diario = daily_channel_counts(cube) if not cube.empty else None
+    return channel_series(diario) if diario is not None else {}
+
+def _digest(valor):
+    return hashlib.sha256(json.dumps(valor, sort_keys=True, default=str).encode()).hexdigest()
+
+def section_digests(snapshot):
+    """
+    Hash dos dados de cada parte da página (cartões, cada gráfico e insights),
+    para só atualizar a tela quando algum agregado mudou de fato
+    """
+    kpis = snapshot['kpis']
+    digests = {
+        'cards': _digest({nome: kpis.get(nome) for nome in ('leads_dia', 'total_sem_resposta', 'percentual_sem_resposta', 'total_leads', 'janelas_moveis', 'janelas_moveis_por_canal')}),
+        'insights': _digest([kpis.get('canal_performance'), kpis.get('sem_resposta_por_segmento')])
+    }
+    for nome, fig in snapshot['charts'].items():
+        digests[nome] = _digest(fig)
+    return digests
+
+# CARTÕES DE KPIS PRINCIPAIS: (chave em kpis, rótulo, estilo, sufixo)
+KPI_CARDS = [
+    ('leads_dia', 'Leads Abordados Hoje', 'metric-card', ''),
+    ('total_sem_resposta', 'Leads Sem Resposta', 'alert-card', ''),
+    ('percentual_sem_resposta', '% Sem Resposta', 'alert-card', '%'),
+    ('total_leads', 'Total de Leads', 'success-card', '')
+]
+
+# INSIGHTS AUTOMÁTICOS
+def build_insights(kpis):
+    """
+    Texto dos insights (markdown) e o nível da caixa em que aparece: 'info' ou 'warning'
+    """
+    if kpis['canal_performance'].empty:
+        return 'warning', "⚠️ Não foi possível gerar insights. Verifique os dados de canal."
+    
+    best_channel = kpis['canal_performance'].loc[kpis['canal_performance']['taxa_retorno'].idxmax(), 'CANAL']
+    best_rate = kpis['canal_performance']['taxa_retorno'].max()
+    
+    if not kpis['sem_resposta_por_segmento'].empty:
+        worst_segment = kpis['sem_resposta_por_segmento'].loc[kpis['sem_resposta_por_segmento']['quantidade'].idxmax(), 'SEGMENTO']
+        worst_count = kpis['sem_resposta_por_segmento']['quantidade'].max()
+        
+        return 'info', f"""
+        **🏆 Canal Mais Eficiente:** {best_channel} com {best_rate:.1f}% de taxa de retorno
+        
+        **⚠️ Segmento com Mais Não Respostas:** {worst_segment} ({worst_count} leads sem resposta)
+        
+        **📊 Recomendação:** Foque seus esforços no canal {best_channel} e revise a estratégia para o segmento {worst_segment}
+        """
+    return 'info', f"""
+        **🏆 Canal Mais Eficiente:** {best_channel} com {best_rate:.1f}% de taxa de retorno
+        
+        **📊 Recomendação:** Continue focando no canal {best_channel} para maximizar resultados.
+        """
@@ -0,0 +1,246 @@
+# Previsão de Leads por Canal
+# Ajusta um modelo por canal num pool de processos e guarda as previsões em disco,
+# identificadas pelo hash da série de cada canal: só o canal cujo histórico mudou é reajustado.
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait as futures_wait
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+FORECAST_HORIZON = 14  # dias previstos
+FORECAST_MIN_DAYS = 28  # histórico mínimo para prever um canal
+FORECAST_METRICS = ['leads', 'com_retorno']
+FORECAST_HISTORY_DAYS = 60  # dias reais guardados junto da previsão, para o gráfico
+FORECAST_CACHE_DIR = os.environ.get('DASHBOARD_FORECAST_DIR', '.forecast_cache')
+# Incrementar sempre que o modelo ou o formato da previsão mudar
+FORECAST_MODEL_VERSION = 1
+
+def channel_series(diario):
+    """
+    Série diária (dias corridos, zero nos dias sem leads) de cada canal, a partir da tabela DIA x CANAL.
+    Todos os canais vão até o último dia dos dados, mesmo os que pararam de receber leads.
+    """
+    if diario.empty:
+        return {}
+    datas = diario.index.get_level_values('DIA')
+    dias = pd.date_range(datas.min(), datas.max(), freq='D')
+    series = {}
+    for canal, tabela in diario[FORECAST_METRICS].groupby(level='CANAL'):
+        serie = tabela.droplevel('CANAL')
+        inicio = serie.index.min()
+        serie = serie.reindex(dias[dias >= inicio], fill_value=0).rename_axis('DIA').reset_index()
+        series[str(canal)] = serie
+    return series
+
+def series_hash(serie, horizonte=FORECAST_HORIZON):
+    """
+    Identifica o conteúdo da série (e a configuração do modelo) para o cache das previsões
+    """
+    sha = hashlib.sha256(f"{FORECAST_MODEL_VERSION}:{horizonte}".encode())
+    sha.update(serie['DIA'].to_numpy().astype('datetime64[ns]').astype('int64').tobytes())
+    for metrica in FORECAST_METRICS:
+        sha.update(serie[metrica].to_numpy(dtype='int64').tobytes())
+    return sha.hexdigest()
+
+def _prophet_forecast(serie, metrica, horizonte):
+    from prophet import Prophet
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+    modelo = Prophet(
+        daily_seasonality=False,
+        weekly_seasonality=True,
+        yearly_seasonality=len(serie) >= 365
+    )
+    modelo.fit(pd.DataFrame({'ds': serie['DIA'], 'y': serie[metrica]}))
+    previsao = modelo.predict(modelo.make_future_dataframe(periods=horizonte, include_history=False))
+    return previsao['yhat'].to_numpy(), previsao['yhat_lower'].to_numpy(), previsao['yhat_upper'].to_numpy()
+
+def _weekday_forecast(serie, metrica, horizonte, semanas=8):
+    """
+    Alternativa sem o Prophet: média das últimas `semanas` ocorrências de cada dia da semana
+    """
+    recente = serie.tail(semanas * 7)
+    por_dia_semana = recente.groupby(recente['DIA'].dt.dayofweek)[metrica].agg(['mean', 'std']).fillna(0)
+    dias = pd.date_range(serie['DIA'].iloc[-1] + pd.Timedelta(days=1), periods=horizonte, freq='D')
+    estatisticas = por_dia_semana.reindex(dias.dayofweek, fill_value=0)
+    media = estatisticas['mean'].to_numpy()
+    # Faixa de ~80%, como o intervalo padrão do Prophet
+    desvio = 1.28 * estatisticas['std'].to_numpy()
+    return media, media - desvio, media + desvio
+
+def fit_channel(serie, horizonte=FORECAST_HORIZON):
+    """
+    Ajusta os modelos de um canal e retorna a previsão (executado nos processos do pool)
+    """
+    try:
+        import prophet  # noqa: F401
+        modelo, prever = 'prophet', _prophet_forecast
+    except ImportError:
+        modelo, prever = 'media_dia_semana', _weekday_forecast
+
+    dias = pd.date_range(serie['DIA'].iloc[-1] + pd.Timedelta(days=1), periods=horizonte, freq='D')
+    previsao = pd.DataFrame({'DIA': dias.strftime('%Y-%m-%d')})
+    for metrica in FORECAST_METRICS:
+        valor, minimo, maximo = prever(serie, metrica, horizonte)
+        # Contagens não ficam negativas
+        previsao[metrica] = np.clip(valor, 0, None).round(2)
+        previsao[f'{metrica}_min'] = np.clip(minimo, 0, None).round(2)
+        previsao[f'{metrica}_max'] = np.clip(maximo, 0, None).round(2)
+
+    historico = serie.tail(FORECAST_HISTORY_DAYS)
+    return {
+        'modelo': modelo,
+        'ajustado_em': datetime.now().isoformat(timespec='seconds'),
+        'historico': historico.assign(DIA=historico['DIA'].dt.strftime('%Y-%m-%d')).to_dict('records'),
+        'previsao': previsao.to_dict('records')
+    }
+
+class ForecastManager:
+    """
+    Previsões por canal compartilhadas pelo processo: lê do cache (memória e disco) sem bloquear
+    e envia ao pool de processos só os canais cuja série ainda não tem previsão
+    """
+    def __init__(self, cache_dir=FORECAST_CACHE_DIR, workers=None):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.versao = 0
+        self.erros = {}
+        self._resultados = {}
+        self._pendentes = {}
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: o processo do dashboard tem threads, e fork com threads não é seguro
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._pool
+
+    def _cache_path(self, chave):
+        return os.path.join(self.cache_dir, f"{chave}.json")
+
+    def _load(self, chave):
+        """
+        Previsão da memória ou do disco; None se ainda não existe
+        """
+        with self._lock:
+            if chave in self._resultados:
+                return self._resultados[chave]
+        try:
+            with open(self._cache_path(chave), encoding='utf-8') as f:
+                resultado = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._resultados[chave] = resultado
+        return resultado
+
+    def _save(self, chave, resultado):
+        path = self._cache_path(chave)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Sem o cache em disco, a previsão vale só enquanto o processo durar
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def request(self, series, horizonte=FORECAST_HORIZON):
+        """
+        Garante uma previsão para cada série (canal -> DataFrame), ajustando em segundo plano as que faltam.
+        Retorna canal -> chave da previsão.
+        """
+        chaves = {}
+        for canal, serie in series.items():
+            if len(serie) < FORECAST_MIN_DAYS:
+                continue
+            chave = series_hash(serie, horizonte)
+            chaves[canal] = chave
+            with self._lock:
+                if chave in self._pendentes:
+                    continue
+            if self._load(chave) is not None:
+                continue
+            with self._lock:
+                futuro = self._get_pool().submit(fit_channel, serie, horizonte)
+                self._pendentes[chave] = futuro
+            futuro.add_done_callback(partial(self._done, chave))
+        return chaves
+
+    def _done(self, chave, futuro):
+        try:
+            resultado = futuro.result()
+            self._save(chave, resultado)
+            with self._lock:
+                self._resultados[chave] = resultado
+                self.erros.pop(chave, None)
+        except Exception as e:
+            # Não vai para o cache: o canal é reajustado na próxima solicitação
+            with self._lock:
+                self.erros[chave] = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._pendentes.pop(chave, None)
+                self.versao += 1
+
+    def lookup(self, chaves):
+        """
+        Previsões já prontas (canal -> previsão), quantos canais ainda estão sendo ajustados
+        e os que falharam (canal -> erro); nunca bloqueia
+        """
+        prontas = {}
+        pendentes = 0
+        falhas = {}
+        for canal, chave in chaves.items():
+            resultado = self._load(chave)
+            if resultado is not None:
+                prontas[canal] = resultado
+                continue
+            with self._lock:
+                if chave in self._pendentes:
+                    pendentes += 1
+                elif chave in self.erros:
+                    falhas[canal] = self.erros[chave]
+        return prontas, pendentes, falhas
+
+    def missing(self, chaves):
+        """
+        Chaves sem previsão no cache, sem ajuste em andamento e sem falha registrada
+        (ex.: o cache em disco foi apagado ou o processo reiniciou antes do ajuste terminar)
+        """
+        faltando = []
+        for chave in chaves.values():
+            if self._load(chave) is not None:
+                continue
+            with self._lock:
+                if chave not in self._pendentes and chave not in self.erros:
+                    faltando.append(chave)
+        return faltando
+
+    def wait(self):
+        """
+        Espera os ajustes em andamento, inclusive o registro dos resultados (feito depois que o futuro termina)
+        """
+        while True:
+            with self._lock:
+                futuros = list(self._pendentes.values())
+            if not futuros:
+                return
+            futures_wait(futuros)
+            time.sleep(0.01)
@@ -0,0 +1,276 @@
+# Relatório Estático Agendado
+# Roda o pipeline do dashboard uma vez e grava um relatório HTML autocontido (cartões, gráficos e insights)
+# e imagens PNG dos gráficos. Os nomes levam o hash do conteúdo: dias sem mudança nos dados reaproveitam
+# os arquivos, que podem ser servidos como estáticos com cache longo.
+#
+# Uso:
+#   python report_export.py --output relatorios
+#   python report_export.py planilha.xlsx --output relatorios --every 60
+#   python report_export.py --output relatorios --no-images   # só o HTML, sem o kaleido
+#   cron (todo dia às 7h): 0 7 * * * cd /app && python report_export.py --output /var/www/relatorios
+#
+# Na pasta de saída: index.html (aponta para o relatório atual), manifest.json e os arquivos com hash
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import textwrap
+import time
+import traceback
+from datetime import datetime
+
+# Nas exportações as métricas por etapa não vão para o arquivo do dashboard
+os.environ.setdefault('DASHBOARD_METRICS_FILE', '')
+
+from kpi_engine import DEFAULT_FILE, deserialize_kpis, file_fingerprint, measure, read_kpi_snapshot
+from kpi_views import KPI_CARDS, build_insights, compute_snapshot, section_digests
+
+# Imagens estáticas dos gráficos pelo kaleido (está no requirements.txt); sem ele, a exportação
+# falha, a menos que seja pedida só com o HTML (--no-images)
+try:
+    import kaleido  # noqa: F401
+except ImportError:
+    kaleido = None
+
+# Incrementar sempre que o layout do relatório mudar (gera novos nomes de arquivo)
+REPORT_VERSION = 2
+REPORT_KEEP = 30  # relatórios mantidos na pasta de saída
+IMAGE_SIZE = (1200, 600)
+HASH_LENGTH = 12
+
+# Gráficos do relatório, na ordem do dashboard; o título de cada um vira o cabeçalho da seção
+REPORT_CHARTS = ['daily_evolution', 'channel_performance', 'segments_no_response']
+
+REPORT_CSS = """
+body { font-family: Inter, -apple-system, BlinkMacSystemFont, sans-serif; margin: 0 auto; max-width: 1200px; padding: 2rem 1rem; color: #1f2937; }
+h1 { font-size: 2.2rem; color: #1e3d59; text-align: center; margin-bottom: 0.25rem; }
+.periodo { text-align: center; color: #6b7280; margin-bottom: 2rem; }
+h2 { font-size: 1.4rem; color: #2c5f2d; border-bottom: 2px solid #97bc62; padding-bottom: 0.5rem; }
+.cards { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 1rem; margin-bottom: 1rem; }
+.metric-card, .alert-card, .success-card { padding: 1.5rem; border-radius: 15px; color: white; text-align: center; }
+.metric-card { background: linear-gradient(135deg, #72559a 0%, #9177d1 100%); }
+.alert-card { background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%); }
+.success-card { background: linear-gradient(135deg, #56ab2f 0%, #a8e6cf 100%); }
+.metric-number { font-size: 2.2rem; font-weight: 700; }
+.metric-label { font-size: 1rem; color: #f0f0f0; margin-top: 0.5rem; }
+.insights { padding: 1rem 1.25rem; border-radius: 10px; }
+.insights.info { background: #e8f1fb; color: #0b4a8b; }
+.insights.warning { background: #fff6dd; color: #7a5300; }
+"""
+
+def _content_hash(valor):
+    return hashlib.sha256(json.dumps(valor, sort_keys=True, default=str).encode()).hexdigest()[:HASH_LENGTH]
+
+def current_snapshot(file_path):
+    """
+    KPIs e gráficos da visão sem filtros: usa o snapshot gravado pelo dashboard se ainda corresponde
+    ao Excel; senão, roda o pipeline uma vez (sem gravar, para não descartar as previsões do dashboard)
+    """
+    snapshot = read_kpi_snapshot(file_path)
+    with measure('report.snapshot') as m:
+        if snapshot is not None and snapshot['fonte'] == file_fingerprint(file_path)['sha256']:
+            m['cache'] = 'hit'
+            return snapshot
+        m['cache'] = 'miss'
+        return compute_snapshot(file_path)
+
+def report_hash(snapshot):
+    """
+    Hash do que aparece no relatório (cartões, gráficos e insights), sem a data de geração
+    """
+    digests = section_digests(snapshot)
+    opcoes = snapshot['opcoes']
+    periodo = [str(opcoes.get(chave))[:10] for chave in ('inicio', 'fim')]
+    return _content_hash([REPORT_VERSION, periodo, digests])
+
+def _markdown_to_html(texto):
+    """
+    Converte o markdown simples dos insights (parágrafos e **negrito**) em HTML
+    """
+    paragrafos = [p.strip() for p in textwrap.dedent(texto).strip().split('\n\n') if p.strip()]
+    return ''.join(
+        '<p>' + re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(p)) + '</p>'
+        for p in paragrafos
+    )
+
+def _split_title(figura):
+    """
+    Título do gráfico (usado como cabeçalho da seção) e a figura sem ele, para não aparecer duas vezes
+    """
+    layout = dict(figura.get('layout', {}))
+    titulo = layout.pop('title', None)
+    texto = titulo.get('text', '') if isinstance(titulo, dict) else titulo or ''
+    return texto, {**figura, 'layout': layout}
+
+def _card(estilo, valor, rotulo):
+    return f'<div class="{estilo}"><div class="metric-number">{html.escape(str(valor))}</div><div class="metric-label">{rotulo}</div></div>'
+
+def render_report_html(snapshot):
+    """
+    Página HTML autocontida (plotly.js embutido uma única vez), igual para os mesmos dados
+    """
+    import plotly.io as pio
+
+    kpis = deserialize_kpis(snapshot['kpis'])
+    cartoes = ''.join(_card(estilo, f"{kpis[chave]}{sufixo}", html.escape(rotulo)) for chave, rotulo, estilo, sufixo in KPI_CARDS)
+    janelas = ''.join(
+        _card('metric-card', janela.leads, f"Leads nos Últimos {janela.janela} Dias<br>{janela.taxa_retorno:.1f}% de retorno · {janela.taxa_positiva:.1f}% positivas")
+        for janela in kpis['janelas_moveis'].itertuples()
+    )
+
+    graficos = []
+    for nome in REPORT_CHARTS:
+        if nome not in snapshot['charts']:
+            continue
+        titulo, figura = _split_title(snapshot['charts'][nome])
+        graficos.append(f"<h2>{html.escape(titulo)}</h2>" + pio.to_html(
+            figura,
+            full_html=False,
+            include_plotlyjs=not graficos,
+            div_id=f"grafico-{nome}",
+            config={'displaylogo': False, 'responsive': True}
+        ))
+
+    nivel, texto = build_insights(kpis)
+    opcoes = snapshot['opcoes']
+    periodo = f"Dados de {str(opcoes['inicio'])[:10]} a {str(opcoes['fim'])[:10]}" if opcoes.get('inicio') else "Sem dados"
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Dashboard Comercial Rankrup</title>
+<style>{REPORT_CSS}</style>
+</head>
+<body>
+<h1>📊 Dashboard Comercial Rankrup</h1>
+<div class="periodo">{periodo}</div>
+<h2>📈 KPIs Principais</h2>
+<div class="cards">{cartoes}</div>
+<div class="cards">{janelas}</div>
+{''.join(graficos)}
+<h2>💡 Insights Automáticos</h2>
+<div class="insights {nivel}">{_markdown_to_html(texto)}</div>
+</body>
+</html>
+"""
+
+def _write_atomic(path, conteudo):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(conteudo if isinstance(conteudo, bytes) else conteudo.encode('utf-8'))
+    os.replace(tmp_path, path)
+
+def export_images(snapshot, output_dir):
+    """
+    Grava um PNG por gráfico, com o hash da figura no nome; figuras sem mudança não são redesenhadas
+    """
+    import plotly.io as pio
+
+    imagens = {}
+    for nome in REPORT_CHARTS:
+        if nome not in snapshot['charts']:
+            continue
+        arquivo = f"{nome}-{_content_hash(snapshot['charts'][nome])}.png"
+        path = os.path.join(output_dir, arquivo)
+        if not os.path.exists(path):
+            with measure('report.imagem', grafico=nome):
+                _write_atomic(path, pio.to_image(snapshot['charts'][nome], format='png', width=IMAGE_SIZE[0], height=IMAGE_SIZE[1]))
+        imagens[nome] = arquivo
+    return imagens
+
+def _read_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _prune(output_dir, historico):
+    """
+    Remove relatórios e imagens com hash que não estão entre os `REPORT_KEEP` mais recentes
+    """
+    em_uso = {entrada['relatorio'] for entrada in historico}
+    for entrada in historico:
+        em_uso.update(entrada['imagens'].values())
+    padrao = re.compile(rf"^(relatorio|{'|'.join(REPORT_CHARTS)})-[0-9a-f]{{{HASH_LENGTH}}}\.(html|png)$")
+    for arquivo in os.listdir(output_dir):
+        if padrao.match(arquivo) and arquivo not in em_uso:
+            os.remove(os.path.join(output_dir, arquivo))
+
+def export_report(file_path, output_dir, keep=REPORT_KEEP, images=True):
+    """
+    Exporta o relatório do Excel atual. Retorna o manifesto; 'reaproveitado' indica que nada mudou.
+    """
+    if images and kaleido is None:
+        raise RuntimeError("kaleido não instalado: sem ele as imagens PNG não são geradas (instale-o ou use --no-images)")
+    os.makedirs(output_dir, exist_ok=True)
+    with measure('report.exportar') as m:
+        snapshot = current_snapshot(file_path)
+        relatorio = f"relatorio-{report_hash(snapshot)}.html"
+        path = os.path.join(output_dir, relatorio)
+        reaproveitado = os.path.exists(path)
+        if not reaproveitado:
+            _write_atomic(path, render_report_html(snapshot))
+        imagens = export_images(snapshot, output_dir) if images else {}
+        m['cache'] = 'hit' if reaproveitado else 'miss'
+
+    # index.html só muda quando o relatório atual muda
+    index = f'<!DOCTYPE html><meta charset="utf-8"><meta http-equiv="refresh" content="0; url={relatorio}"><a href="{relatorio}">Relatório atual</a>\n'
+    index_path = os.path.join(output_dir, 'index.html')
+    try:
+        with open(index_path, encoding='utf-8') as f:
+            atual = f.read()
+    except OSError:
+        atual = None
+    if atual != index:
+        _write_atomic(index_path, index)
+
+    entrada = {'relatorio': relatorio, 'imagens': imagens}
+    historico = [entrada] + [e for e in _read_manifest(output_dir).get('historico', []) if e['relatorio'] != relatorio]
+    historico = historico[:keep]
+    manifesto = {
+        'relatorio': relatorio,
+        'imagens': imagens,
+        'fonte': snapshot['fonte'],
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'reaproveitado': reaproveitado,
+        'historico': historico
+    }
+    _write_atomic(os.path.join(output_dir, 'manifest.json'), json.dumps(manifesto, ensure_ascii=False, indent=2))
+    _prune(output_dir, historico)
+    return manifesto
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o dashboard como relatório HTML estático e imagens")
+    parser.add_argument('arquivo', nargs='?', default=DEFAULT_FILE, help="Planilha do dashboard (.xlsx)")
+    parser.add_argument('--output', default='relatorios', help="Pasta de saída")
+    parser.add_argument('--every', type=float, default=None, help="Repete a exportação a cada N minutos (padrão: uma vez)")
+    parser.add_argument('--keep', type=int, default=REPORT_KEEP, help="Relatórios mantidos na pasta")
+    parser.add_argument('--no-images', action='store_true', help="Exporta só o HTML, sem as imagens PNG")
+    args = parser.parse_args()
+
+    if not args.no_images and kaleido is None:
+        # Sem as imagens pedidas, a exportação (e o cron) falha em vez de sair incompleta
+        sys.exit("kaleido não instalado: instale-o (pip install -r requirements.txt) ou use --no-images")
+
+    while True:
+        try:
+            manifesto = export_report(args.arquivo, args.output, args.keep, images=not args.no_images)
+            situacao = 'sem mudanças, reaproveitado' if manifesto['reaproveitado'] else 'novo'
+            print(f"{manifesto['gerado_em']} {os.path.join(args.output, manifesto['relatorio'])} ({situacao})", file=sys.stderr)
+        except Exception:
+            if args.every is None:
+                raise
+            # No modo agendado, uma falha não interrompe as próximas exportações
+            traceback.print_exc()
+        if args.every is None:
+            break
+        time.sleep(args.every * 60)
+
+if __name__ == "__main__":
+    main()
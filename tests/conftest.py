@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Os testes não gravam métricas no arquivo do dashboard
+os.environ['DASHBOARD_METRICS_FILE'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
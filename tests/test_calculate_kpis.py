@@ -0,0 +1,41 @@
+# Cubo persistido x DataFrame: o cubo só é reaproveitado se veio da mesma versão do Excel
+
+from generate_leads import generate_leads, write_leads
+from kpi_engine import calculate_kpis, kpis_from_cube, load_dataset, load_persisted_cube
+
+def test_persisted_cube_is_used_for_the_same_source(tmp_path, monkeypatch):
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(generate_leads(300, channels=3, days=10, seed=1), path)
+    df = load_dataset(path)
+    cube = load_persisted_cube(path)
+    assert cube.attrs['fingerprint'] == df.attrs['fingerprint']
+
+    chamadas = []
+    monkeypatch.setattr('kpi_engine.build_cube', lambda df: chamadas.append(df))
+    calculate_kpis(df, cube)
+    assert chamadas == []
+
+def test_cube_from_another_version_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(generate_leads(300, channels=3, days=10, invalid_date_rate=0, seed=1), path)
+    load_dataset(path)
+    antigo = load_persisted_cube(path)
+
+    # Mesmo número de linhas, conteúdo diferente: a soma do cubo não denuncia a troca
+    write_leads(generate_leads(300, channels=3, days=10, invalid_date_rate=0, seed=2), path)
+    df = load_dataset(path)
+    assert int(antigo.sum()) == len(df)
+    esperado = calculate_kpis(df)
+    assert not kpis_from_cube(antigo)['canal_performance'].equals(esperado['canal_performance'])
+    obtido = calculate_kpis(df, antigo)
+    assert obtido['canal_performance'].equals(esperado['canal_performance'])
+    assert obtido['leads_por_dia'].equals(esperado['leads_por_dia'])
+
+def test_cube_without_source_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(generate_leads(300, channels=3, days=10, seed=1), path)
+    df = load_dataset(path)
+    sem_fonte = df.copy()
+    sem_fonte.attrs = {}
+    cube = load_persisted_cube(path)
+    assert calculate_kpis(sem_fonte, cube)['total_leads'] == len(df)
@@ -0,0 +1,52 @@
+# Regressão de canal_performance: a agregação agrupada deve reproduzir o laço por canal original
+
+import pandas as pd
+import pytest
+
+from generate_leads import generate_leads
+from kpi_engine import calculate_kpis, clean_data
+
+def reference_channel_performance(df):
+    """
+    Cálculo original de canal_performance (um filtro do DataFrame por canal), mantido como referência
+    """
+    canal_counts = df.groupby('CANAL').size().reset_index(name='total_leads')
+    canal_stats_list = []
+    for canal in canal_counts['CANAL'].unique():
+        canal_df = df[df['CANAL'] == canal]
+        total = len(canal_df)
+        sem_resposta = len(canal_df[canal_df['RESULTADO'].isin(['NÃO RESPONDEU', 'VISUALIZOU E NÃO RESPONDEU'])])
+        com_retorno = total - sem_resposta
+        negativo = len(canal_df[canal_df['RESULTADO'] == 'NEGATIVO'])
+        positivo = len(canal_df[canal_df['RESULTADO'].isin(['POSITIVO', 'INTERESSADO', 'RESPONDEU E MARCOU CALL'])])
+        taxa_retorno = (com_retorno / total * 100) if total > 0 else 0
+        taxa_positiva = (positivo / total * 100) if total > 0 else 0
+        canal_stats_list.append({
+            'CANAL': canal,
+            'total_leads': total,
+            'com_retorno': com_retorno,
+            'sem_resposta': sem_resposta,
+            'respostas_negativas': negativo,
+            'respostas_positivas': positivo,
+            'taxa_retorno': round(taxa_retorno, 1),
+            'taxa_positiva': round(taxa_positiva, 1)
+        })
+    return pd.DataFrame(canal_stats_list)
+
+def _comparable(tabela):
+    tabela = tabela.astype({'CANAL': str})
+    return tabela.sort_values('CANAL', ignore_index=True)
+
+@pytest.mark.parametrize('seed, rows, channels', [(0, 500, 1), (1, 3000, 3), (2, 8000, 6), (3, 5000, 9)])
+def test_channel_performance_matches_reference(seed, rows, channels):
+    df = clean_data(generate_leads(rows, channels=channels, segments=5, days=60, seed=seed))
+    atual = calculate_kpis(df)['canal_performance']
+    pd.testing.assert_frame_equal(_comparable(atual), _comparable(reference_channel_performance(df)), check_dtype=False)
+
+def test_channel_performance_with_rare_results():
+    # Canais sem nenhum positivo ou sem nenhum "sem resposta" também batem
+    mix = {'Não Respondeu': 0.5, 'Negativo': 0.5}
+    df = clean_data(generate_leads(400, channels=4, result_mix=mix, seed=7))
+    atual = calculate_kpis(df)['canal_performance']
+    pd.testing.assert_frame_equal(_comparable(atual), _comparable(reference_channel_performance(df)), check_dtype=False)
+    assert (atual['respostas_positivas'] == 0).all()
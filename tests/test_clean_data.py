@@ -0,0 +1,80 @@
+# Limpeza dos dados: normalização das colunas de texto
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from generate_leads import generate_leads, write_leads
+from kpi_engine import FilterIndex, calculate_kpis, clean_data, load_dataset, load_persisted_cube, open_store
+
+def _raw(**colunas):
+    base = {
+        'DATA_ABORDAGEM': ['2025-01-01', '2025-01-02', '2025-01-02'],
+        'SEGMENTO': [' b2b', 'Agencia ', 'B2B'],
+        'CANAL': ['Linkedin', 'Email', 'linkedin '],
+        'RESULTADO': ['Positivo', 'Não respondeu', 'Negativo']
+    }
+    base.update(colunas)
+    return pd.DataFrame(base)
+
+def test_text_columns_are_normalized_categoricals():
+    df = clean_data(_raw())
+    assert isinstance(df['CANAL'].dtype, pd.CategoricalDtype)
+    assert df['CANAL'].tolist() == ['LINKEDIN', 'EMAIL', 'LINKEDIN']
+    assert df['SEGMENTO'].tolist() == ['B2B', 'AGENCIA', 'B2B']
+
+def test_blank_text_cells_stay_missing():
+    df = clean_data(_raw(SEGMENTO=['b2b', None, np.nan], RESULTADO=['Positivo', None, 'Negativo']))
+    assert df['SEGMENTO'].isna().tolist() == [False, True, True]
+    assert list(df['SEGMENTO'].cat.categories) == ['B2B']
+    assert df['RESULTADO'].isna().sum() == 1
+    assert calculate_kpis(df)['total_leads'] == 3
+
+def test_text_nan_is_not_a_blank_cell():
+    # Só células vazias ficam ausentes; o texto 'nan' digitado na planilha é uma categoria como outra qualquer
+    df = clean_data(_raw(CANAL=['nan', None, 'Email']))
+    assert df['CANAL'].isna().tolist() == [False, True, False]
+    assert list(df['CANAL'].cat.categories) == ['EMAIL', 'NAN']
+
+def test_load_dataset_with_blank_cells(tmp_path):
+    path = tmp_path / 'leads.xlsx'
+    _raw(SEGMENTO=['b2b', None, 'Agencia'], CANAL=['Linkedin', 'Email', None]).to_excel(path, index=False)
+    df = load_dataset(str(path))
+    assert len(df) == 3
+    assert df['SEGMENTO'].isna().sum() == 1
+    assert df['CANAL'].isna().sum() == 1
+
+def _blank_leads():
+    df = generate_leads(2000, channels=4, segments=5, days=30, seed=7).astype(object)
+    rng = np.random.default_rng(7)
+    for col in ['SEGMENTO', 'CANAL', 'RESULTADO']:
+        df.loc[rng.random(len(df)) < 0.05, col] = None
+    return df
+
+def test_blank_cells_count_like_the_original_loop():
+    df = clean_data(_blank_leads())
+    kpis = calculate_kpis(df)
+    assert kpis['total_leads'] == len(df)
+    # Canais e segmentos vazios ficam fora das tabelas; RESULTADO vazio conta no total do canal
+    com_canal = df[df['CANAL'].notna()]
+    canais = kpis['canal_performance'].set_index('CANAL')
+    assert canais['total_leads'].sum() == len(com_canal)
+    assert canais.loc['LINKEDIN', 'total_leads'] == (com_canal['CANAL'] == 'LINKEDIN').sum()
+    assert kpis['sem_resposta_por_segmento']['SEGMENTO'].notna().all()
+
+def test_store_matches_cube_with_blank_cells(tmp_path):
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(_blank_leads(), path)
+    load_dataset(path)
+    cubo = FilterIndex(load_persisted_cube(path))
+    store = open_store(path)
+    assert store.options() == cubo.options()
+    for filtros in [{}, {'canais': ['LINKEDIN', 'EMAIL']}, {'segmentos': ['B2B']}]:
+        esperado, obtido = cubo.calculate_kpis(**filtros), store.calculate_kpis(**filtros)
+        for nome in ['total_leads', 'total_sem_resposta', 'leads_dia']:
+            assert obtido[nome] == esperado[nome]
+        for nome in ['canal_performance', 'sem_resposta_por_segmento']:
+            assert_frame_equal(
+                obtido[nome].astype(str).reset_index(drop=True),
+                esperado[nome].astype(str).reset_index(drop=True)
+            )
@@ -0,0 +1,20 @@
+# Evolução diária: redução por LTTB e troca para WebGL em períodos longos
+
+import pandas as pd
+
+from kpi_views import DAILY_MAX_POINTS, WEBGL_POINT_THRESHOLD, daily_evolution_figure
+
+def _serie(dias):
+    datas = pd.date_range('2020-01-01', periods=dias, freq='D')
+    return pd.DataFrame({'DIA': datas, 'leads': [i % 17 for i in range(dias)]})
+
+def test_short_period_uses_svg():
+    fig = daily_evolution_figure(_serie(90))
+    assert fig.data[0].type == 'scatter'
+    assert fig.layout.meta['pontos'] == 90
+
+def test_long_period_uses_webgl_after_downsampling():
+    dias = WEBGL_POINT_THRESHOLD + 500
+    fig = daily_evolution_figure(_serie(dias))
+    assert fig.data[0].type == 'scattergl'
+    assert fig.layout.meta == {'pontos': DAILY_MAX_POINTS, 'pontos_originais': dias}
@@ -0,0 +1,42 @@
+# Previsões por canal depois de reiniciar o dashboard com o Excel inalterado
+
+import threading
+
+from dashboard import SnapshotRefresher
+from generate_leads import generate_leads, write_leads
+from kpi_engine import write_kpi_snapshot
+from kpi_views import compute_snapshot
+from lead_forecast import ForecastManager
+
+def _join_refit_threads():
+    for thread in threading.enumerate():
+        if thread.name == 'dashboard-previsoes':
+            thread.join(60)
+
+def test_missing_forecasts_are_requested_again_on_start(tmp_path):
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(generate_leads(600, channels=2, days=40, seed=5), path)
+    primeiro = ForecastManager(str(tmp_path / 'cache_antigo'), workers=1)
+    snapshot = compute_snapshot(path, primeiro)
+    primeiro.wait()
+    write_kpi_snapshot(path, snapshot)
+    assert len(snapshot['previsoes']) == 2
+
+    # Novo processo, cache de previsões vazio: o snapshot em disco continua válido
+    forecaster = ForecastManager(str(tmp_path / 'cache_novo'), workers=1)
+    assert forecaster.missing(snapshot['previsoes']) == list(snapshot['previsoes'].values())
+    refresher = SnapshotRefresher(path, forecaster)
+    _join_refit_threads()
+    forecaster.wait()
+
+    prontas, pendentes, falhas = forecaster.lookup(refresher.snapshot()['previsoes'])
+    assert set(prontas) == set(snapshot['previsoes'])
+    assert (pendentes, falhas) == (0, {})
+    assert refresher.refit_missing_forecasts() is False
+
+def test_failed_fits_are_reported_and_not_retried(tmp_path):
+    forecaster = ForecastManager(str(tmp_path), workers=1)
+    forecaster.erros['abc'] = 'ValueError: série constante'
+    prontas, pendentes, falhas = forecaster.lookup({'LINKEDIN': 'abc'})
+    assert (prontas, pendentes, falhas) == ({}, 0, {'LINKEDIN': 'ValueError: série constante'})
+    assert forecaster.missing({'LINKEDIN': 'abc'}) == []
@@ -0,0 +1,110 @@
+# Ingestão incremental: linhas novas no final entram pelo watermark; qualquer outra mudança reconstrói
+
+import os
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_series_equal
+
+import kpi_engine
+from generate_leads import generate_leads, write_leads
+from kpi_engine import _load_from_source, _read_sidecar_metadata, build_cube, clean_data
+
+@pytest.fixture
+def leituras(monkeypatch):
+    """
+    Registra cada leitura do Excel: 'incremental', 'alterada' (prefixo mudou) ou 'completa'
+    """
+    registro = []
+    original = kpi_engine._read_sheet
+
+    def espiao(file_path, watermark=None):
+        lidas = original(file_path, watermark)
+        registro.append('completa' if watermark is None else 'incremental' if lidas is not None else 'alterada')
+        return lidas
+
+    monkeypatch.setattr(kpi_engine, '_read_sheet', espiao)
+    return registro
+
+@pytest.fixture
+def planilha(tmp_path):
+    path = str(tmp_path / 'leads.xlsx')
+    leads = generate_leads(400, channels=3, segments=4, days=20, seed=11)
+    write_leads(leads.iloc[:300], path)
+    return path, leads
+
+def _assert_matches_full_read(path, df, cube):
+    """
+    O resultado acumulado é igual ao de uma leitura completa do Excel
+    """
+    esperado = clean_data(pd.read_excel(path))
+    assert df['ID_LEAD'].tolist() == esperado['ID_LEAD'].tolist()
+    assert_series_equal(cube.sort_index(), build_cube(esperado).sort_index(), check_names=False)
+    assert _read_sidecar_metadata(path)['watermark']['linhas'] == len(pd.read_excel(path))
+
+def test_first_load_reads_everything(planilha, leituras):
+    path, _ = planilha
+    df, cube = _load_from_source(path)
+    assert leituras == ['completa']
+    _assert_matches_full_read(path, df, cube)
+
+def test_appended_rows_are_read_incrementally(planilha, leituras):
+    path, leads = planilha
+    _load_from_source(path)
+    write_leads(leads, path)
+
+    df, cube = _load_from_source(path)
+    assert leituras == ['completa', 'incremental']
+    _assert_matches_full_read(path, df, cube)
+
+def test_edited_row_rebuilds(planilha, leituras):
+    path, leads = planilha
+    _load_from_source(path)
+    editadas = leads.iloc[:300].copy()
+    editadas['RESULTADO'] = editadas['RESULTADO'].astype(object)
+    editadas.loc[10, 'RESULTADO'] = 'Positivo' if editadas.loc[10, 'RESULTADO'] != 'Positivo' else 'Negativo'
+    write_leads(editadas, path)
+
+    df, cube = _load_from_source(path)
+    assert leituras == ['completa', 'alterada', 'completa']
+    _assert_matches_full_read(path, df, cube)
+
+def test_truncated_sheet_rebuilds(planilha, leituras):
+    path, leads = planilha
+    _load_from_source(path)
+    write_leads(leads.iloc[:200], path)
+
+    df, cube = _load_from_source(path)
+    assert leituras == ['completa', 'alterada', 'completa']
+    assert len(df) == len(clean_data(pd.read_excel(path)))
+    _assert_matches_full_read(path, df, cube)
+
+def test_touched_but_unchanged_sheet_keeps_the_data(planilha, leituras):
+    path, _ = planilha
+    df_antes, cube_antes = _load_from_source(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    df, cube = _load_from_source(path)
+    # Só o mtime mudou: nenhuma linha nova e nada reconstruído
+    assert leituras == ['completa', 'incremental']
+    assert df['ID_LEAD'].tolist() == df_antes['ID_LEAD'].tolist()
+    assert_series_equal(cube, cube_antes)
+    _assert_matches_full_read(path, df, cube)
+
+    # O fingerprint gravado passa a ser o do arquivo tocado
+    _load_from_source(path)
+    assert leituras == ['completa', 'incremental']
+
+def test_appended_rows_with_blank_cells(tmp_path, leituras):
+    path = str(tmp_path / 'leads.xlsx')
+    leads = generate_leads(400, channels=3, segments=4, days=20, seed=12).astype(object)
+    leads.loc[[5, 150, 320, 390], 'CANAL'] = None
+    leads.loc[[7, 330], 'SEGMENTO'] = None
+    write_leads(leads.iloc[:300], path)
+    _load_from_source(path)
+    write_leads(leads, path)
+
+    df, cube = _load_from_source(path)
+    assert leituras == ['completa', 'incremental']
+    _assert_matches_full_read(path, df, cube)
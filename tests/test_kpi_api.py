@@ -0,0 +1,41 @@
+# API de KPIs: ETag forte por rota, derivado do corpo da resposta
+
+import json
+
+from kpi_api import API_ROUTES, KpiApi
+
+def _snapshot(gerado_em='2025-01-10T08:00:00', total=10):
+    return {
+        'fonte': 'abc123',
+        'gerado_em': gerado_em,
+        'kpis': {'total_leads': total, 'canal_performance': [], 'sem_resposta_por_segmento': []}
+    }
+
+def test_each_route_has_its_own_etag_and_304():
+    api = KpiApi(lambda: _snapshot())
+    etags = set()
+    for rota in API_ROUTES:
+        status, cabecalhos, corpo = api.respond(rota)
+        assert status == 200 and json.loads(corpo)['fonte'] == 'abc123'
+        etags.add(cabecalhos['ETag'])
+        assert api.respond(rota, cabecalhos['ETag'])[0] == 304
+    assert len(etags) == len(API_ROUTES)
+
+def test_etag_changes_with_any_field_of_the_body():
+    atual = {'snapshot': _snapshot()}
+    api = KpiApi(lambda: atual['snapshot'])
+    _, cabecalhos, _ = api.respond('/kpis')
+
+    # Mesma planilha, novo cálculo: gerado_em muda, então o corpo e o ETag também
+    atual['snapshot'] = _snapshot(gerado_em='2025-01-10T09:00:00')
+    status, novos, corpo = api.respond('/kpis', cabecalhos['ETag'])
+    assert status == 200 and novos['ETag'] != cabecalhos['ETag']
+    assert json.loads(corpo)['gerado_em'] == '2025-01-10T09:00:00'
+
+    # Snapshot trocado com o mesmo conteúdo: o cliente continua recebendo 304
+    atual['snapshot'] = _snapshot(gerado_em='2025-01-10T09:00:00')
+    assert api.respond('/kpis', novos['ETag'])[0] == 304
+
+def test_unknown_route_and_missing_snapshot():
+    assert KpiApi(lambda: None).respond('/kpis')[0] == 503
+    assert KpiApi(lambda: _snapshot()).respond('/outra')[0] == 404
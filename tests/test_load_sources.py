@@ -0,0 +1,62 @@
+# Junção de várias planilhas/abas e remoção opcional de leads repetidos
+
+import pandas as pd
+import pytest
+
+from generate_leads import generate_leads, write_leads
+from kpi_engine import LEAD_KEY_COLUMNS, deduplicate_leads, load_sources
+
+def _leads(ids, datas, resultados):
+    return pd.DataFrame({
+        'ID_LEAD': ids,
+        'DATA_ABORDAGEM': pd.to_datetime(datas),
+        'RESULTADO': resultados
+    })
+
+def test_no_key_by_default():
+    assert LEAD_KEY_COLUMNS == []
+    df = _leads([1, 1], ['2025-01-01', '2025-01-02'], ['A', 'B'])
+    assert deduplicate_leads(df) is df
+
+def test_latest_date_wins():
+    # O registro lido por último é o mais antigo: vale a data mais recente
+    df = _leads([1, 2, 1], ['2025-01-05', '2025-01-01', '2025-01-03'], ['NOVO', 'UNICO', 'ANTIGO'])
+    unicos = deduplicate_leads(df, ['ID_LEAD'])
+    assert unicos['RESULTADO'].tolist() == ['NOVO', 'UNICO']
+    assert unicos.attrs['leads_repetidos'] == 1
+
+def test_same_date_keeps_the_last_read():
+    df = _leads([7, 7, 7], ['2025-01-02'] * 3, ['PRIMEIRO', 'SEGUNDO', 'TERCEIRO'])
+    unicos = deduplicate_leads(df, ['ID_LEAD'])
+    assert unicos['RESULTADO'].tolist() == ['TERCEIRO']
+    assert unicos.attrs['leads_repetidos'] == 2
+
+def test_rows_without_key_are_all_kept():
+    df = _leads([None, None, 3], ['2025-01-01', '2025-01-01', '2025-01-01'], ['A', 'B', 'C'])
+    unicos = deduplicate_leads(df, ['ID_LEAD'])
+    assert unicos['RESULTADO'].tolist() == ['A', 'B', 'C']
+    assert unicos.attrs['leads_repetidos'] == 0
+
+def test_missing_key_column_is_an_error():
+    with pytest.raises(KeyError):
+        deduplicate_leads(_leads([1], ['2025-01-01'], ['A']), ['EMAIL'])
+
+@pytest.fixture
+def equipes(tmp_path):
+    # ID_LEAD é um contador por planilha (1..N), como na planilha original
+    caminhos = []
+    for i, linhas in enumerate([300, 200]):
+        path = str(tmp_path / f'equipe{i}.xlsx')
+        write_leads(generate_leads(linhas, days=20, invalid_date_rate=0, seed=i), path)
+        caminhos.append(path)
+    return caminhos
+
+def test_merge_keeps_every_row_without_key(equipes):
+    df = load_sources(equipes, workers=1)
+    assert len(df) == 500
+    assert df.attrs['leads_repetidos'] == 0
+
+def test_merge_with_key_counts_collapsed_rows(equipes):
+    df = load_sources(equipes, chave=['ID_LEAD'], workers=1)
+    assert len(df) == 300
+    assert df.attrs['leads_repetidos'] == 200
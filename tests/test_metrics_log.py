@@ -0,0 +1,42 @@
+# Registro de métricas: gravação em lote e rotação do arquivo por tamanho
+
+import json
+
+import kpi_engine
+from kpi_engine import MetricsLog
+
+def _linhas(path):
+    return [json.loads(linha) for linha in path.read_text(encoding='utf-8').splitlines()] if path.exists() else []
+
+def test_records_are_buffered_until_flush(tmp_path):
+    path = tmp_path / 'metricas.jsonl'
+    log = MetricsLog(str(path))
+    for i in range(10):
+        log.add({'etapa': 'teste', 'i': i})
+    assert _linhas(path) == []
+    assert log.count('teste') == 10
+
+    log.flush()
+    assert [r['i'] for r in _linhas(path)] == list(range(10))
+    log.flush()
+    assert len(_linhas(path)) == 10
+
+def test_full_buffer_is_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(kpi_engine, 'METRICS_FLUSH_RECORDS', 5)
+    path = tmp_path / 'metricas.jsonl'
+    log = MetricsLog(str(path))
+    for i in range(7):
+        log.add({'etapa': 'teste', 'i': i})
+    assert len(_linhas(path)) == 5
+
+def test_file_is_rotated_by_size(tmp_path):
+    path = tmp_path / 'metricas.jsonl'
+    log = MetricsLog(str(path), max_bytes=1000)
+    for lote in range(5):
+        for i in range(10):
+            log.add({'etapa': 'teste', 'lote': lote, 'i': i})
+        log.flush()
+    assert path.stat().st_size <= 1000
+    anterior = tmp_path / 'metricas.jsonl.1'
+    assert anterior.exists() and anterior.stat().st_size <= 1000
+    assert _linhas(path)[-1] == {'etapa': 'teste', 'lote': 4, 'i': 9}
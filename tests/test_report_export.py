@@ -0,0 +1,41 @@
+# Relatório estático: exportação sem Streamlit, cabeçalhos a partir dos títulos dos gráficos
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import report_export
+from generate_leads import generate_leads, write_leads
+from report_export import REPORT_CHARTS, export_report
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def planilha(tmp_path):
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(generate_leads(500, channels=3, segments=4, days=30, seed=3), path)
+    return path
+
+def test_exporter_does_not_import_streamlit():
+    codigo = "import sys, report_export, benchmark; print('streamlit' in sys.modules)"
+    saida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    assert saida.stdout.strip() == 'False'
+
+def test_chart_titles_become_the_headings(planilha, tmp_path):
+    saida = tmp_path / 'relatorios'
+    manifesto = export_report(planilha, str(saida), images=False)
+    pagina = (saida / manifesto['relatorio']).read_text(encoding='utf-8')
+    titulos = ['📈 Evolução Diária de Leads', "📊 Lead&#x27;s que me responderam", "🎯 Lead&#x27;s que não responderam"]
+    assert re.findall(r'<h2>([^<]*)</h2>', pagina)[1:1 + len(REPORT_CHARTS)] == titulos
+    # O título não é repetido dentro da figura
+    assert pagina.count('Evolução Diária de Leads') == 1
+    assert pagina.count('que não responderam') == 1
+
+def test_missing_kaleido_fails_unless_images_are_skipped(planilha, tmp_path, monkeypatch):
+    monkeypatch.setattr(report_export, 'kaleido', None)
+    with pytest.raises(RuntimeError, match='kaleido'):
+        export_report(planilha, str(tmp_path / 'relatorios'))
+    assert export_report(planilha, str(tmp_path / 'relatorios'), images=False)['imagens'] == {}
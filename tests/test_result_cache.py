@@ -0,0 +1,86 @@
+# Cache de resultados: validade (TTL), remoção dos menos usados (LRU) e contagem de bytes
+
+import pandas as pd
+import pytest
+
+import kpi_engine
+from kpi_engine import ResultCache, _estimate_size
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """
+    Relógio controlado pelo teste no lugar de time.monotonic
+    """
+    agora = [1000.0]
+    monkeypatch.setattr(kpi_engine.time, 'monotonic', lambda: agora[0])
+    return agora
+
+def test_entries_expire_after_ttl(relogio):
+    cache = ResultCache(ttl_seconds=10, max_bytes=10_000)
+    cache.put('a', 'x' * 100)
+    relogio[0] += 10
+    assert cache.get('a') == 'x' * 100
+
+    relogio[0] += 0.5
+    assert cache.get('a') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 0, 'bytes': 0}
+
+def test_zero_ttl_never_expires(relogio):
+    cache = ResultCache(ttl_seconds=0, max_bytes=10_000)
+    cache.put('a', 'valor')
+    relogio[0] += 10**6
+    assert cache.get('a') == 'valor'
+
+def test_least_recently_used_is_evicted(relogio):
+    cache = ResultCache(ttl_seconds=0, max_bytes=300)
+    for chave in 'abc':
+        cache.put(chave, chave * 100)
+    # 'a' passa a ser o mais recente; 'b' é o que sai quando 'd' não cabe
+    assert cache.get('a') == 'a' * 100
+    cache.put('d', 'd' * 100)
+
+    assert cache.get('b') is None
+    assert [cache.get(chave) for chave in 'acd'] == ['a' * 100, 'c' * 100, 'd' * 100]
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 3
+    assert stats['bytes'] == 300
+
+def test_large_value_evicts_several_entries(relogio):
+    cache = ResultCache(ttl_seconds=0, max_bytes=300)
+    for chave in 'abc':
+        cache.put(chave, chave * 100)
+    cache.put('d', 'd' * 250)
+    assert cache.stats()['evictions'] == 3
+    assert cache.stats()['bytes'] == 250
+    assert cache.get('d') == 'd' * 250
+
+def test_value_larger_than_the_limit_is_not_stored(relogio):
+    cache = ResultCache(ttl_seconds=0, max_bytes=100)
+    cache.put('a', 'a' * 50)
+    cache.put('grande', 'g' * 101)
+    assert cache.get('grande') is None
+    assert cache.get('a') == 'a' * 50
+    assert cache.stats()['bytes'] == 50
+
+def test_byte_accounting(relogio):
+    cache = ResultCache(ttl_seconds=10, max_bytes=10**7)
+    tabela = pd.DataFrame({'CANAL': ['EMAIL', 'LINKEDIN'], 'total_leads': [3, 4]})
+    kpis = {'total_leads': 7, 'canal_performance': tabela}
+    cache.put('kpis', kpis)
+    cache.put('grafico', 'g' * 500)
+    assert cache.stats()['bytes'] == _estimate_size(kpis) + 500
+    assert _estimate_size(kpis) >= int(tabela.memory_usage(deep=True).sum())
+
+    # Substituir uma chave desconta o valor anterior
+    cache.put('grafico', 'g' * 200)
+    assert cache.stats()['bytes'] == _estimate_size(kpis) + 200
+
+    # Itens expirados deixam de contar
+    relogio[0] += 11
+    assert cache.get('grafico') is None
+    assert cache.stats()['bytes'] == _estimate_size(kpis)
+
+    cache.clear()
+    assert cache.stats()['bytes'] == 0
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,48 @@
+# Janelas móveis e médias móveis: leads sem canal contam no total geral, não na abertura por canal
+
+import pandas as pd
+import pytest
+
+from generate_leads import write_leads
+from kpi_engine import calculate_kpis, clean_data, open_store
+
+def _raw(canais):
+    return pd.DataFrame({
+        'DATA_ABORDAGEM': pd.to_datetime(['2025-01-01', '2025-01-02', '2025-01-02', '2025-01-02']),
+        'SEGMENTO': ['B2B'] * 4,
+        'CANAL': canais,
+        'RESULTADO': ['Positivo', 'Negativo', 'Não respondeu', 'Positivo']
+    })
+
+def _kpis_cubo(raw, tmp_path):
+    return calculate_kpis(clean_data(raw))
+
+def _kpis_banco(raw, tmp_path):
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(raw, path)
+    return open_store(path).calculate_kpis()
+
+@pytest.mark.parametrize('calcular', [_kpis_cubo, _kpis_banco])
+def test_blank_channel_counts_in_overall_windows(calcular, tmp_path):
+    kpis = calcular(_raw(['Linkedin', None, None, 'Email']), tmp_path)
+    assert (kpis['total_leads'], kpis['leads_dia']) == (4, 3)
+
+    janelas = kpis['janelas_moveis'].set_index('janela')
+    assert janelas['leads'].tolist() == [4, 4, 4]
+    assert janelas.loc[7, ['com_retorno', 'respostas_positivas']].tolist() == [3, 2]
+    assert janelas.loc[7, 'taxa_retorno'] == 75.0
+
+    por_canal = kpis['janelas_moveis_por_canal']
+    assert sorted(por_canal['CANAL'].unique()) == ['EMAIL', 'LINKEDIN']
+    assert por_canal[por_canal['janela'] == 7]['leads'].sum() == 2
+
+    # A média móvel acompanha a série diária: (1 + 3) / 2 no segundo dia
+    media = kpis['media_movel_diaria'].set_index('DIA')
+    assert media.loc[pd.Timestamp('2025-01-02'), 'media_7d'] == 2.0
+
+@pytest.mark.parametrize('calcular', [_kpis_cubo, _kpis_banco])
+def test_all_channels_blank(calcular, tmp_path):
+    kpis = calcular(_raw([None] * 4), tmp_path)
+    assert kpis['janelas_moveis'].set_index('janela').loc[30, 'leads'] == 4
+    assert kpis['janelas_moveis_por_canal'].empty
+    assert kpis['media_movel_diaria']['media_7d'].tolist() == [1.0, 2.0]
@@ -0,0 +1,33 @@
+# Construção do banco SQLite: processos concorrentes usam temporários próprios e não apagam os dos outros
+
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from generate_leads import generate_leads, write_leads
+from kpi_engine import _build_store, _store_path, file_fingerprint, open_store
+
+def test_foreign_temp_file_is_left_alone(tmp_path):
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(generate_leads(200, seed=3), path)
+    # Temporário de outro processo ainda gravando o banco
+    alheio = f"{_store_path(path)}.tmp"
+    with open(alheio, 'wb') as f:
+        f.write(b'em uso')
+
+    kpis = open_store(path).calculate_kpis()
+    assert kpis['total_leads'] == 200
+    with open(alheio, 'rb') as f:
+        assert f.read() == b'em uso'
+    assert glob.glob(f"{_store_path(path)}.*.tmp") == []
+
+def test_concurrent_builds(tmp_path):
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(generate_leads(300, seed=4), path)
+    fingerprint = file_fingerprint(path)
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda _: _build_store(path, fingerprint), range(4)))
+
+    assert open_store(path).calculate_kpis()['total_leads'] == 300
+    assert not any(nome.endswith('.tmp') for nome in os.listdir(tmp_path))
@@ -0,0 +1,38 @@
+# Cubo montado em blocos: mesmo resultado da leitura completa, sem juntar as linhas
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_series_equal
+
+import kpi_engine
+from batch_kpis import process_workbook
+from generate_leads import generate_leads, write_leads
+from kpi_engine import build_cube, calculate_kpis, clean_data, stream_cube
+
+def _planilha(tmp_path):
+    df = generate_leads(700, channels=3, segments=4, days=25, seed=9).astype(object)
+    rng = np.random.default_rng(9)
+    df.loc[rng.random(len(df)) < 0.05, 'CANAL'] = None
+    path = str(tmp_path / 'leads.xlsx')
+    write_leads(df, path)
+    return path
+
+def test_stream_cube_matches_full_read_with_small_chunks(tmp_path, monkeypatch):
+    path = _planilha(tmp_path)
+    tamanhos = []
+    original = kpi_engine.build_cube
+    monkeypatch.setattr(kpi_engine, 'build_cube', lambda df: tamanhos.append(len(df)) or original(df))
+
+    cube = stream_cube(path, chunk_rows=64)
+    # Cada bloco tem no máximo chunk_rows linhas e só as colunas do cubo
+    assert max(tamanhos) <= 64 and len(tamanhos) > 10
+    esperado = original(clean_data(pd.read_excel(path)))
+    assert_series_equal(cube.sort_index(), esperado.sort_index(), check_names=False)
+
+def test_batch_uses_the_streamed_cube(tmp_path):
+    path = _planilha(tmp_path)
+    resultado = process_workbook(path)
+    assert resultado['status'] == 'ok'
+    esperado = calculate_kpis(clean_data(pd.read_excel(path)))
+    assert resultado['kpis']['total_leads'] == esperado['total_leads']
+    assert not (tmp_path / 'leads.xlsx.cache.parquet').exists()
@@ -0,0 +1,74 @@
+# Top-N + OUTROS: totais exatos na fatia OUTROS e taxas recalculadas a partir das contagens somadas
+
+import pandas as pd
+
+from generate_leads import generate_leads
+from kpi_engine import (
+    CANAL_CONTAGENS, TOP_N_CATEGORIES, _add_top_n, calculate_kpis, clean_data, top_n_with_others
+)
+
+def _canais(totais):
+    """
+    Tabela no formato de canal_performance, com contagens derivadas do total de cada canal
+    """
+    tabela = pd.DataFrame({'CANAL': [f"C{i}" for i in range(len(totais))], 'total_leads': totais})
+    tabela['sem_resposta'] = tabela['total_leads'] // 3
+    tabela['com_retorno'] = tabela['total_leads'] - tabela['sem_resposta']
+    tabela['respostas_negativas'] = tabela['com_retorno'] // 2
+    tabela['respostas_positivas'] = tabela['com_retorno'] - tabela['respostas_negativas']
+    return tabela
+
+def test_others_row_has_exact_totals():
+    tabela = _canais([5, 40, 12, 7, 90, 3, 30, 1, 60, 8])
+    top = top_n_with_others(tabela, 'CANAL', 'total_leads', CANAL_CONTAGENS, n=4)
+
+    assert top['CANAL'].tolist() == ['C4', 'C8', 'C1', 'C6', 'OUTROS (6)']
+    resto = tabela[~tabela['CANAL'].isin(['C4', 'C8', 'C1', 'C6'])]
+    assert top.iloc[-1][CANAL_CONTAGENS].tolist() == resto[CANAL_CONTAGENS].sum().tolist()
+    assert top[CANAL_CONTAGENS].sum().tolist() == tabela[CANAL_CONTAGENS].sum().tolist()
+
+def test_ties_keep_the_original_order():
+    tabela = _canais([10, 20, 10, 10, 5])
+    top = top_n_with_others(tabela, 'CANAL', 'total_leads', CANAL_CONTAGENS, n=2)
+    assert top['CANAL'].tolist() == ['C1', 'C0', 'OUTROS (3)']
+
+def test_no_fold_when_only_one_row_would_be_grouped():
+    for linhas in [3, 4, 5]:
+        tabela = _canais(list(range(1, linhas + 1)))
+        top = top_n_with_others(tabela, 'CANAL', 'total_leads', CANAL_CONTAGENS, n=4)
+        # Com até n + 1 linhas a tabela volta inteira, na ordem original e sem OUTROS
+        assert top['CANAL'].tolist() == tabela['CANAL'].tolist()
+        assert not top['CANAL'].str.startswith('OUTROS').any()
+
+def test_others_rates_are_recomputed_from_summed_counts():
+    tabela = _canais([100, 50, 9, 7, 3])
+    tabela['taxa_retorno'] = (tabela['com_retorno'] / tabela['total_leads'] * 100).round(1)
+    tabela['taxa_positiva'] = (tabela['respostas_positivas'] / tabela['total_leads'] * 100).round(1)
+    kpis = _add_top_n({
+        'canal_performance': tabela,
+        'sem_resposta_por_segmento': pd.DataFrame({'SEGMENTO': ['A', 'B', 'C'], 'quantidade': [4, 2, 1]})
+    }, n=2)
+
+    top = kpis['canal_performance_top']
+    outros = top.iloc[-1]
+    assert outros['CANAL'] == 'OUTROS (3)'
+    assert outros['total_leads'] == 19
+    assert outros['com_retorno'] == 6 + 5 + 2
+    # A média das taxas dos canais agrupados daria outro valor; a taxa é a das contagens somadas
+    assert outros['taxa_retorno'] == round(13 / 19 * 100, 1)
+    assert outros['taxa_positiva'] == round(outros['respostas_positivas'] / 19 * 100, 1)
+    assert top.iloc[:2][['taxa_retorno', 'taxa_positiva']].values.tolist() == \
+        tabela.iloc[:2][['taxa_retorno', 'taxa_positiva']].values.tolist()
+
+    # Segmentos: n + 1 linhas, nada é agrupado
+    assert kpis['sem_resposta_por_segmento_top']['SEGMENTO'].tolist() == ['A', 'B', 'C']
+
+def test_calculated_kpis_fold_extra_channels():
+    df = clean_data(generate_leads(4000, channels=TOP_N_CATEGORIES + 4, seed=5))
+    kpis = calculate_kpis(df)
+    completa, top = kpis['canal_performance'], kpis['canal_performance_top']
+
+    assert len(completa) == TOP_N_CATEGORIES + 4
+    assert len(top) == TOP_N_CATEGORIES + 1
+    assert top.iloc[-1]['CANAL'] == 'OUTROS (4)'
+    assert top[CANAL_CONTAGENS].sum().tolist() == completa[CANAL_CONTAGENS].sum().tolist()